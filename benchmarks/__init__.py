@@ -0,0 +1,3 @@
+"""
+Benchmark harness for LFEA: mock Ollama server, synthetic corpora and scenarios.
+"""
@@ -0,0 +1,124 @@
+"""
+Synthetic directory tree generator for benchmarks.
+"""
+
+import os
+import random
+from pathlib import Path
+from typing import Dict
+
+WORDS = (
+    "invoice payment budget quarterly revenue tax receipt recipe garlic tomato oven bake "
+    "flight hotel itinerary passport beach museum experiment hypothesis molecule data "
+    "meeting agenda minutes action notes contract clause liability agreement signature "
+    "report summary project deadline team review apple cheese milk chicken potato pear"
+).split()
+
+# (extension, share of files, min bytes, max bytes)
+FILE_MIX = [
+    (".txt", 0.55, 200, 20000),
+    (".md", 0.05, 200, 5000),
+    (".py", 0.10, 200, 8000),
+    (".csv", 0.05, 500, 50000),
+    (".jpg", 0.15, 2000, 200000),
+    (".zip", 0.05, 2000, 100000),
+    (".pdf", 0.03, 0, 0),
+    (".docx", 0.02, 0, 0),
+]
+
+def _text(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+def _write_pdf(path: Path, text: str):
+    import pymupdf
+    document = pymupdf.open()
+    page = document.new_page()
+    page.insert_textbox(page.rect + (36, 36, -36, -36), text)
+    document.save(str(path))
+
+def _write_docx(path: Path, text: str):
+    import docx
+    document = docx.Document()
+    document.add_paragraph(text)
+    document.save(str(path))
+
+def _revise(rng: random.Random, text: str) -> str:
+    """Return text with one word replaced, like a lightly edited copy."""
+    words = text.split(" ")
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+def generate_corpus(root: str, n_files: int, fanout: int = 20, files_per_dir: int = 100,
+                    seed: int = 0, rich_formats: bool = True, duplicates: float = 0.0) -> Dict[str, int]:
+    """Create n_files files under root with a mix of types, sizes and nesting.
+
+    Directories hold up to files_per_dir files and up to fanout subdirectories, so the
+    tree depth grows logarithmically with n_files. PDF and DOCX files are only written
+    when rich_formats is set and the optional libraries are installed; otherwise they
+    are replaced by text files. With duplicates > 0 that share of text files repeats an
+    earlier text file, half of them exactly and half with one word changed. Returns a
+    count of files per extension.
+    """
+    rng = random.Random(seed)
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    extensions = [mix[0] for mix in FILE_MIX]
+    weights = [mix[1] for mix in FILE_MIX]
+    sizes = {mix[0]: (mix[2], mix[3]) for mix in FILE_MIX}
+    counts: Dict[str, int] = {}
+    originals = []
+
+    for index in range(n_files):
+        # Spread files over a tree addressed by the directory number in base `fanout`
+        directory_number = index // files_per_dir
+        parts = []
+        while directory_number:
+            directory_number, digit = divmod(directory_number, fanout)
+            parts.append(f"dir{digit:02d}")
+        directory = root_path.joinpath(*reversed(parts)) if parts else root_path
+        directory.mkdir(parents=True, exist_ok=True)
+
+        extension = rng.choices(extensions, weights)[0]
+        low, high = sizes[extension]
+        path = directory / f"file{index:07d}{extension}"
+        if extension in (".pdf", ".docx"):
+            text = _text(rng, rng.randint(200, 3000))
+            try:
+                if not rich_formats:
+                    raise ImportError
+                (_write_pdf if extension == ".pdf" else _write_docx)(path, text)
+            except ImportError:
+                extension = ".txt"
+                path = path.with_suffix(extension)
+                path.write_text(text)
+        elif extension in (".jpg", ".zip"):
+            path.write_bytes(os.urandom(rng.randint(low, high)))
+        elif duplicates and extension in (".txt", ".md") and originals and rng.random() < duplicates:
+            text = rng.choice(originals)
+            path.write_text(text if rng.random() < 0.5 else _revise(rng, text))
+        else:
+            text = _text(rng, rng.randint(low, high))
+            if duplicates and len(originals) < 200:
+                originals.append(text)
+            path.write_text(text)
+        counts[extension] = counts.get(extension, 0) + 1
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus")
+    parser.add_argument("root", help="Directory to create")
+    parser.add_argument("--files", type=int, default=1000, help="Number of files (1k to 1M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-rich-formats", action="store_true", help="Write text instead of PDF/DOCX")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Share of text files that copy another")
+    args = parser.parse_args()
+    print(generate_corpus(args.root, args.files, seed=args.seed, rich_formats=not args.no_rich_formats,
+                          duplicates=args.duplicates))
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the Ollama HTTP API with configurable latency and concurrency.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+CATEGORIES = ["Finance", "Recipes", "Travel", "Science", "Meetings", "Legal"]
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8", "replace"), digest_size=8).digest(), "big")
+
+def _verdict(text: str) -> str:
+    """Deterministic YES for roughly a quarter of inputs."""
+    return "YES" if _stable_hash(text) % 4 == 0 else "NO"
+
+class MockOllamaServer:
+    """Threaded HTTP server implementing /api/generate, /api/embeddings and /api/tags.
+
+    Every request sleeps for `latency` seconds (plus `per_token_latency` per prompt
+    token) while holding one of `parallel` slots, mimicking OLLAMA_NUM_PARALLEL.
+    Prompt tokens shared with the start of a recent prompt are free, like Ollama's
+    KV cache reuse, and each generated token costs `decode_latency`. Generation
+    honours `num_predict` and `stop`, and `"stream": true` sends NDJSON chunks.
+    A `failure_rate` share of generate and embedding requests fails with HTTP 503.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 per_token_latency: float = 0.0, parallel: int = 4, embedding_dim: int = 64,
+                 decode_latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.per_token_latency = per_token_latency
+        self.decode_latency = decode_latency
+        self.embedding_dim = embedding_dim
+        self.calls: Dict[str, int] = {"generate": 0, "embeddings": 0, "tags": 0, "failed": 0}
+        self._slots = threading.Semaphore(parallel)
+        self._recent_prompts = deque(maxlen=parallel)
+        self._calls_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_calls(self):
+        with self._calls_lock:
+            for key in self.calls:
+                self.calls[key] = 0
+
+    def _count(self, endpoint: str):
+        with self._calls_lock:
+            self.calls[endpoint] += 1
+
+    def _simulate_work(self, prompt: str) -> bool:
+        """Spend the simulated processing time. Returns False if the request should fail."""
+        with self._calls_lock:
+            cached = max((len(os.path.commonprefix([prompt, recent])) for recent in self._recent_prompts), default=0)
+            self._recent_prompts.append(prompt)
+        with self._slots:
+            time.sleep(self.latency + self.per_token_latency * ((len(prompt) - cached) // 4))
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._count("failed")
+            return False
+        return True
+
+    def _tokens(self, payload: Dict) -> List[str]:
+        """Split the reply into tokens, cut off at num_predict and the first stop sequence."""
+        options = payload.get("options", {})
+        tokens = re.findall(r"\s*\S+|\s+", self._generate(payload))
+        tokens = tokens[:options.get("num_predict") or len(tokens)]
+        text = "".join(tokens)
+        for stop in options.get("stop", []):
+            if stop in text:
+                text = text[:text.index(stop)]
+                tokens = re.findall(r"\s*\S+|\s+", text)
+        return tokens
+
+    def _generate(self, payload: Dict) -> str:
+        prompt = payload.get("prompt", "")
+        if payload.get("format") == "json":
+            numbers = re.findall(r"^\[(\d+)\] File: (.*)$", prompt, re.MULTILINE)
+            return json.dumps({number: _verdict(name) for number, name in numbers})
+        if "Detect the intent" in prompt:
+            return "search"
+        if "ONLY REPLY WITH ONE WORD" in prompt:
+            return CATEGORIES[_stable_hash(prompt) % len(CATEGORIES)]
+        if '"YES" or "NO"' in prompt:
+            name = re.search(r"^File: (.*)$", prompt, re.MULTILINE)
+            # Small models tend to explain themselves unless something cuts them off
+            return f"{_verdict(name.group(1) if name else prompt)}\nThe file content matches the topic."
+        return "This is a mock response."
+
+    def _embed(self, text: str):
+        vector = [0.0] * self.embedding_dim
+        for token in re.findall(r"\w+", text.lower()):
+            vector[_stable_hash(token) % self.embedding_dim] += 1.0
+        return vector
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: Dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, tokens: List[str], final: Dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        time.sleep(server.decode_latency)
+                        self._write_chunk({"model": final["model"], "response": token, "done": False})
+                    self._write_chunk(dict(final, response=""))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, which is how Ollama clients cancel generation
+                    self.close_connection = True
+
+            def _write_chunk(self, body: Dict):
+                data = json.dumps(body).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    server._count("tags")
+                    self._reply(200, {"models": [{"name": "mock"}]})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/generate":
+                    server._count("generate")
+                    prompt = payload.get("prompt", "")
+                    if not server._simulate_work(prompt):
+                        self._reply(503, {"error": "mock failure"})
+                        return
+                    tokens = server._tokens(payload)
+                    final = {"model": payload.get("model"), "done": True,
+                             "prompt_eval_count": len(prompt) // 4, "eval_count": len(tokens)}
+                    if payload.get("stream", True):
+                        self._stream(tokens, final)
+                    else:
+                        time.sleep(server.decode_latency * len(tokens))
+                        self._reply(200, dict(final, response="".join(tokens)))
+                elif self.path == "/api/embeddings":
+                    server._count("embeddings")
+                    prompt = payload.get("prompt", "")
+                    if not server._simulate_work(prompt):
+                        self._reply(503, {"error": "mock failure"})
+                        return
+                    self._reply(200, {"embedding": server._embed(prompt)})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+        return Handler
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent requests served")
+    parser.add_argument("--per-token-latency", type=float, default=0.0, help="Seconds per uncached prompt token")
+    parser.add_argument("--decode-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests that fail with 503")
+    args = parser.parse_args()
+
+    mock = MockOllamaServer(port=args.port, latency=args.latency, parallel=args.parallel,
+                            per_token_latency=args.per_token_latency,
+                            decode_latency=args.decode_latency, failure_rate=args.failure_rate).start()
+    print(f"Mock Ollama listening on {mock.url}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
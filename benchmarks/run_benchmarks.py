@@ -0,0 +1,243 @@
+"""
+Run LFEA benchmark scenarios against the mock Ollama server.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --files 1000 --output results.json
+    python -m benchmarks.run_benchmarks --compare old.json new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from .corpus import generate_corpus
+from .mock_ollama import MockOllamaServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent import LFEAgent  # noqa: E402
+from src.config.settings import Config  # noqa: E402
+
+SCENARIOS = ("scan", "search_cold", "search_warm", "organize", "intent")
+INTENT_QUERIES = [
+    "search for invoices from last quarter",
+    "organize my downloads folder",
+    "find meeting notes about the budget",
+    "what can you do?",
+    "sort these files into folders",
+]
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB (0.0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class LatencyRecorder:
+    """Wraps client methods to record the wall time of each LLM request."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def wrap(self, method: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples.append(time.perf_counter() - start)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self.samples = []
+
+def build_agent(mocks: List[MockOllamaServer], work_dir: Path, args) -> LFEAgent:
+    """Create an agent whose config points at the mock servers and a scratch cache dir."""
+    config = Config()
+    config_data = {key: value for key, value in vars(config).items() if key != "config_path"}
+    config_data.update(ollama_url=mocks[0].url, ollama_backends=[mock.url for mock in mocks],
+                       cache_dir=str(work_dir / "cache"))
+    config_path = work_dir / "config.json"
+    config_path.write_text(json.dumps(config_data))
+    return LFEAgent(config_path=str(config_path), workers=args.workers, batch_size=args.batch_size)
+
+def run_scenario(name: str, action: Callable[[], int], mocks: List[MockOllamaServer],
+                 recorder: LatencyRecorder, quiet: bool) -> Dict:
+    """Time one scenario; action returns the number of items it processed."""
+    for mock in mocks:
+        mock.reset_calls()
+    recorder.reset()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        items = action()
+    seconds = time.perf_counter() - start
+    llm_calls = sum(mock.calls["generate"] + mock.calls["embeddings"] for mock in mocks)
+    samples = recorder.samples
+    return {
+        "scenario": name,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_sec": round(items / seconds, 2) if seconds else 0.0,
+        "llm_calls": llm_calls,
+        "llm_calls_per_item": round(llm_calls / items, 4) if items else 0.0,
+        "llm_failed_calls": sum(mock.calls["failed"] for mock in mocks),
+        "latency_p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "latency_p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "latency_p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def run(args) -> Dict:
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="lfea-bench-"))
+    corpus = work_dir / "corpus"
+    if not corpus.exists():
+        print(f"Generating {args.files} files in {corpus}...")
+        generate_corpus(str(corpus), args.files, seed=args.seed, rich_formats=not args.no_rich_formats,
+                        duplicates=args.duplicates)
+
+    # Only the first backend fails, so the others show how much throughput survives it
+    mocks = [MockOllamaServer(latency=args.latency, parallel=args.parallel,
+                              per_token_latency=args.per_token_latency, decode_latency=args.decode_latency,
+                              failure_rate=args.failure_rate if i == 0 else 0.0).start()
+             for i in range(max(1, args.backends))]
+    try:
+        agent = build_agent(mocks, work_dir, args)
+        recorder = LatencyRecorder()
+        agent.llm_client.query = recorder.wrap(agent.llm_client.query)
+        agent.llm_client.query_choice = recorder.wrap(agent.llm_client.query_choice)
+        agent.llm_client.embed = recorder.wrap(agent.llm_client.embed)
+        analyzer = agent.content_analyzer
+        documents = sum(1 for _ in analyzer.scanner.scan(str(corpus), analyzer.document_extensions))
+
+        def scan() -> int:
+            return sum(len(files) for files in agent.scan_directory(str(corpus)).values())
+
+        def search() -> int:
+            agent.search_files_by_content(str(corpus), args.query)
+            return documents
+
+        def organize() -> int:
+            # A dry run journals its categories; start cold so reruns measure classification again
+            shutil.rmtree(work_dir / "cache" / "organize_jobs", ignore_errors=True)
+            agent.organize_files_by_content(str(corpus), dry_run=True)
+            return documents
+
+        def intent() -> int:
+            for query in INTENT_QUERIES * args.intent_rounds:
+                agent.detect_intent(query)
+            return len(INTENT_QUERIES) * args.intent_rounds
+
+        actions = {"scan": scan, "search_cold": search, "search_warm": search,
+                   "organize": organize, "intent": intent}
+        results = []
+        for name in args.scenarios:
+            result = run_scenario(name, actions[name], mocks, recorder, not args.verbose)
+            print(f"  {name:12s} {result['items']:>8d} items  {result['items_per_sec']:>10.2f}/s  "
+                  f"p95 {result['latency_p95_ms']:>8.2f} ms  {result['llm_calls_per_item']:.3f} calls/item")
+            results.append(result)
+    finally:
+        for mock in mocks:
+            mock.stop()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "files": args.files, "documents": documents, "latency": args.latency,
+            "parallel": args.parallel, "per_token_latency": args.per_token_latency,
+            "decode_latency": args.decode_latency, "workers": args.workers, "batch_size": args.batch_size,
+            "query": args.query, "duplicates": args.duplicates,
+            "backends": args.backends, "failure_rate": args.failure_rate,
+        },
+        "results": results,
+    }
+
+def compare(old_path: str, new_path: str):
+    """Print throughput and latency changes between two result files."""
+    with open(old_path) as f:
+        old = {r["scenario"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["scenario"]: r for r in json.load(f)["results"]}
+    print(f"{'scenario':12s} {'items/s old':>12s} {'items/s new':>12s} {'speedup':>8s} {'p95 old':>9s} {'p95 new':>9s}")
+    for name in new:
+        if name not in old:
+            continue
+        before, after = old[name], new[name]
+        speedup = after["items_per_sec"] / before["items_per_sec"] if before["items_per_sec"] else float("inf")
+        print(f"{name:12s} {before['items_per_sec']:>12.2f} {after['items_per_sec']:>12.2f} {speedup:>7.2f}x "
+              f"{before['latency_p95_ms']:>9.2f} {after['latency_p95_ms']:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="LFEA benchmarks")
+    parser.add_argument("--files", type=int, default=1000, help="Corpus size (1k to 1M)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--query", default="quarterly invoice payments")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock seconds per LLM request")
+    parser.add_argument("--parallel", type=int, default=4, help="Mock concurrent request slots")
+    parser.add_argument("--per-token-latency", type=float, default=0.0,
+                        help="Mock seconds per prompt token not shared with a recent prompt")
+    parser.add_argument("--decode-latency", type=float, default=0.0, help="Mock seconds per generated token")
+    parser.add_argument("--backends", type=int, default=1, help="Number of mock servers in the backend pool")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Share of requests the first mock server fails with HTTP 503")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--intent-rounds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Reuse a corpus and cache directory between runs")
+    parser.add_argument("--no-rich-formats", action="store_true", help="Write text instead of PDF/DOCX")
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="Share of text files in the corpus that copy another file")
+    parser.add_argument("--output", "-o", help="Write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    parser.add_argument("--verbose", action="store_true", help="Show agent output")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -5,44 +5,190 @@ Main entry point for the AI-powered file management agent.
 """
 
 import argparse
+import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add the src directory to the path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-from src.agent import LFEAgent
-from src.ui.cli import CLI
+# Only light modules are imported up front; the agent and its dependencies load on demand
 from src.utils.banner import display_banner
+from src.utils.metrics import metrics
+from src.core.query_filters import parse_size, parse_time
+
+METRICS_EXPORT_INTERVAL = 15
+SERVICE_MODES = ("search", "organize", "index", "scan", "dedup")
 
 def main():
     """Main entry point for the application."""
     display_banner("LFEA")
     
     parser = argparse.ArgumentParser(description="Local File Explorer Agent")
-    parser.add_argument("--mode", choices=["interactive", "organize", "search"], 
+    parser.add_argument("--mode", choices=["interactive", "organize", "search", "index", "watch", "scan", "dedup", "serve"], 
                        default="interactive", help="Operation mode")
     parser.add_argument("--directory", "-d", type=str, default="./tests", 
                        help="Directory to operate on")
     parser.add_argument("--query", "-q", type=str, help="Search query")
     parser.add_argument("--config", "-c", type=str, help="Config file path")
+    parser.add_argument("--dry-run", action="store_true", help="Show the organize plan without moving files")
+    parser.add_argument("--undo", action="store_true", help="Undo the last organize job in the directory")
+    parser.add_argument("--limit", "-k", type=int, help="Stop searching after this many matches")
+    parser.add_argument("--workers", "-w", type=int, help="Number of concurrent LLM requests")
+    parser.add_argument("--batch-size", type=int, help="Files judged per search prompt (1 disables batching)")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing summary when done")
+    parser.add_argument("--trace", type=str, help="Write a JSON trace of every timed stage to this file")
+    parser.add_argument("--metrics-file", type=str, help="Write Prometheus text-format metrics to this file")
+    parser.add_argument("--port", type=int, default=0, help="Port for serve mode (default: any free port)")
+    parser.add_argument("--no-daemon", action="store_true", help="Run in this process even if a service is running")
+    parser.add_argument("--type", "-t", action="append", dest="types",
+                       help="Only files with this extension or category, e.g. pdf or images (repeatable, comma-separated)")
+    parser.add_argument("--min-size", type=parse_size, help="Only files at least this big, e.g. 500KB or 1MB")
+    parser.add_argument("--max-size", type=parse_size, help="Only files at most this big")
+    parser.add_argument("--modified-after", type=parse_time,
+                       help="Only files modified after this date (YYYY-MM-DD) or within an age such as 7d or 2w")
+    parser.add_argument("--modified-before", type=parse_time, help="Only files modified before this date or age")
     
     args = parser.parse_args()
+    args.filters = filter_options(args)
+    
+    if args.mode == "search" and not args.query and not args.filters:
+        print("❌ Search mode requires a query or filters. Use --query or -q")
+        sys.exit(1)
+    
+    if args.profile or args.trace or args.metrics_file:
+        metrics.enable(tracing=bool(args.trace))
+    try:
+        if not run_remote(args):
+            run_mode(args)
+    finally:
+        export_metrics(args)
+
+def filter_options(args):
+    """Collect the metadata filter flags, or None when none were given."""
+    options = {key: getattr(args, key) for key in ("types", "min_size", "max_size", "modified_after", "modified_before")}
+    options = {key: value for key, value in options.items() if value is not None}
+    return options or None
+
+def run_remote(args) -> bool:
+    """Hand the request to a running service. Returns False when it has to run locally."""
+    local_only = (args.no_daemon or args.workers or args.batch_size
+                  or args.profile or args.trace or args.metrics_file)
+    if args.mode not in SERVICE_MODES or local_only:
+        return False
+    from src.service.client import DaemonClient, DaemonError
+    from src.ui.cli import CLI
+    
+    client = DaemonClient.discover(args.config)
+    if client is None:
+        return False
+    print(f"🛰️  Using agent service at {client.url}")
+    cli = CLI(None, search_limit=args.limit)
+    # The service has its own working directory
+    directory = os.path.abspath(args.directory)
+    try:
+        if args.mode == "search":
+            cli.stream_search_results(client.search(directory, args.query or "", args.limit, args.filters),
+                                      limit=args.limit)
+        elif args.mode == "organize" and args.undo:
+            cli.display_undo_results(client.undo_organize(directory))
+        elif args.mode == "organize":
+            cli.display_organize_results(client.organize(directory, dry_run=args.dry_run))
+        elif args.mode == "index":
+            summary = client.build_index(directory)
+            print(f"\n📊 Indexing complete. {summary['indexed']} indexed, {summary['unchanged']} unchanged, "
+                  f"{summary['removed']} removed.")
+        elif args.mode == "scan":
+            cli.display_scan_results(client.scan_directory(directory, args.filters))
+        elif args.mode == "dedup":
+            cli.display_duplicate_results(client.find_duplicates(directory))
+    except (DaemonError, OSError) as e:
+        print(f"❌ Agent service request failed: {e}")
+        sys.exit(1)
+    return True
+
+def run_mode(args):
+    """Run the selected operation mode."""
+    from src.agent import LFEAgent
+    from src.ui.cli import CLI
     
     # Initialize the agent
-    agent = LFEAgent(config_path=args.config)
-    cli = CLI(agent)
+    agent = LFEAgent(config_path=args.config, workers=args.workers, batch_size=args.batch_size)
+    cli = CLI(agent, search_limit=args.limit)
+    if args.mode in ("interactive", "organize", "search", "serve") and agent.config.llm_warmup and not args.undo:
+        # Load the model while the first directory walk and file reads are under way
+        agent.llm_client.warmup()
+    if args.mode in ("watch", "serve") and agent.config.llm_health_check_interval:
+        # Long-running modes keep the backends' breakers current between requests
+        agent.llm_client.start_health_checks(agent.config.llm_health_check_interval)
     
     if args.mode == "interactive":
         cli.run_interactive()
+    elif args.mode == "organize" and args.undo:
+        cli.display_undo_results(agent.undo_organize(args.directory))
     elif args.mode == "organize":
-        agent.organize_files_by_content(args.directory)
+        result = agent.organize_files_by_content(args.directory, dry_run=args.dry_run)
+        cli.display_organize_results(result)
+    elif args.mode == "index":
+        agent.build_index(args.directory)
+    elif args.mode == "scan":
+        cli.display_scan_results(agent.scan_directory(args.directory, args.filters))
+    elif args.mode == "dedup":
+        cli.display_duplicate_results(agent.find_duplicates(args.directory))
+    elif args.mode == "watch":
+        watcher = agent.watch(args.directory)
+        print("👀 Watching for changes. Press Ctrl+C to stop.")
+        try:
+            # Long-running mode: refresh the Prometheus file periodically, not just at exit
+            while True:
+                time.sleep(METRICS_EXPORT_INTERVAL if args.metrics_file else 1)
+                if args.metrics_file:
+                    metrics.write_prometheus(args.metrics_file)
+        except KeyboardInterrupt:
+            watcher.stop()
+            print("\n👋 Stopped watching.")
+    elif args.mode == "serve":
+        from src.service.server import AgentServer
+        
+        server = AgentServer(agent, args.config, port=args.port)
+        print(f"🛰️  Agent service listening on {server.url}. Press Ctrl+C to stop.")
+        exporting = start_metrics_export(args.metrics_file) if args.metrics_file else None
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Agent service stopped.")
+        finally:
+            if exporting is not None:
+                exporting.set()
     elif args.mode == "search":
-        if not args.query:
-            print("❌ Search mode requires a query. Use --query or -q")
-            sys.exit(1)
-        results = agent.search_files_by_content(args.directory, args.query)
-        cli.display_search_results(results)
+        matches = agent.iter_search_files_by_content(args.directory, args.query or "", args.filters)
+        cli.stream_search_results(matches, limit=args.limit)
+
+def start_metrics_export(path: str) -> threading.Event:
+    """Rewrite the Prometheus file every METRICS_EXPORT_INTERVAL seconds until the returned event is set."""
+    stop = threading.Event()
+    
+    def export():
+        while not stop.wait(METRICS_EXPORT_INTERVAL):
+            metrics.write_prometheus(path)
+    
+    threading.Thread(target=export, name="lfea-metrics", daemon=True).start()
+    return stop
+
+def export_metrics(args):
+    """Write whichever metrics outputs were requested."""
+    if not metrics.enabled:
+        return
+    if args.profile:
+        print("\n⏱️  Profile:")
+        print(metrics.format_summary())
+    if args.trace:
+        metrics.write_trace(args.trace)
+        print(f"🧾 Trace written to {args.trace}")
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,32 +1,157 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 
 from .llm.ollama_client import OllamaClient
+from .core.extractors import ContentExtractor, ExtractionCache
 from .core.file_manager import FileManager
+from .core.scanner import FileScanner
 from .core.intent_detector import IntentDetector
 from .core.content_analyzer import ContentAnalyzer
+from .core.dedup import DuplicateFinder
+from .core.lexical_index import LexicalIndex
+from .core.metadata_catalog import MetadataCatalog
+from .core.query_filters import MetadataFilter
+from .core.vector_index import VectorIndex
+from .core.verdict_cache import VerdictCache
+from .core.watcher import IndexWatcher
 from .config.settings import Config
 
 class LFEAgent:
     """Main agent class that provides high-level interface to all functionality."""
     
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, workers: int = None, batch_size: int = None):
         self.config = Config(config_path)
+        if workers:
+            self.config.workers = workers
+        if batch_size:
+            self.config.relevance_batch_size = batch_size
         self.llm_client = OllamaClient(
             url=self.config.ollama_url,
-            model=self.config.model_name
+            model=self.config.model_name,
+            max_connections=self.config.workers,
+            timeout=self.config.request_timeout,
+            embedding_model=self.config.embedding_model,
+            keep_alive=self.config.keep_alive,
+            backends=self.config.ollama_backends,
+            max_retries=self.config.llm_max_retries,
+            retry_backoff=self.config.llm_retry_backoff,
+            breaker_failures=self.config.llm_breaker_failures,
+            breaker_cooldown=self.config.llm_breaker_cooldown
+        )
+        self.scanner = FileScanner(
+            ignore_patterns=self.config.scan_ignore,
+            skip_hidden=self.config.scan_skip_hidden,
+            max_depth=self.config.scan_max_depth,
+            symlinks=self.config.scan_symlinks,
+            workers=self.config.scan_workers
+        )
+        self.file_manager = FileManager(self.config.file_categories, scanner=self.scanner)
+        self.intent_detector = IntentDetector(
+            self.llm_client,
+            self.config.capabilities,
+            fast_path=self.config.intent_fast_path,
+            memo_size=self.config.intent_memo_size
+        )
+        cache_dir = Path(self.config.cache_dir).expanduser()
+        self.verdict_cache = None
+        if self.config.verdict_cache_enabled:
+            self.verdict_cache = VerdictCache(
+                cache_dir / "verdicts.sqlite3",
+                max_entries=self.config.verdict_cache_max_entries
+            )
+        self.vector_index = VectorIndex(
+            cache_dir / "vector_index",
+            model=self.config.embedding_model,
+            chunk_size=self.config.embedding_chunk_size,
+            max_chunks=self.config.embedding_max_chunks
+        )
+        self.lexical_index = LexicalIndex(cache_dir / "lexical_index")
+        extraction_cache = None
+        if self.config.extraction_cache_enabled:
+            extraction_cache = ExtractionCache(
+                cache_dir / "extracted.sqlite3",
+                max_entries=self.config.extraction_cache_max_entries
+            )
+        self.extractor = ContentExtractor(cache=extraction_cache, processes=self.config.extraction_processes)
+        self.deduplicator = None
+        if self.config.dedup_enabled:
+            self.deduplicator = DuplicateFinder(
+                self.extractor,
+                hasher=self.verdict_cache.fingerprint if self.verdict_cache else None,
+                max_distance=self.config.dedup_near_distance
+            )
+        self.metadata_catalog = MetadataCatalog(self.file_manager.extension_categories, cache_dir / "metadata_catalog")
+        self.content_analyzer = ContentAnalyzer(
+            self.llm_client,
+            verdict_cache=self.verdict_cache,
+            workers=self.config.workers,
+            vector_index=self.vector_index,
+            semantic_top_k=self.config.semantic_top_k,
+            lexical_index=self.lexical_index,
+            lexical_top_n=self.config.lexical_top_n,
+            batch_size=self.config.relevance_batch_size,
+            batch_context_length=self.config.relevance_context_length,
+            organize_clusters=self.config.organize_clusters,
+            scanner=self.scanner,
+            extractor=self.extractor,
+            index_max_chars=self.config.index_max_chars,
+            stream_verdicts=self.config.relevance_streaming,
+            chunk_size=self.config.search_chunk_size,
+            chunk_overlap=self.config.search_chunk_overlap,
+            max_chunks=self.config.search_max_chunks,
+            token_budget=self.config.search_token_budget,
+            deduplicator=self.deduplicator,
+            journal_dir=cache_dir / "organize_jobs" if self.config.organize_journal else None,
+            extension_categories=self.file_manager.extension_categories,
+            metadata_catalog=self.metadata_catalog,
+            query_filters=self.config.query_filters
         )
-        self.file_manager = FileManager(self.config.file_categories)
-        self.intent_detector = IntentDetector(self.llm_client, self.config.capabilities)
-        self.content_analyzer = ContentAnalyzer(self.llm_client)
     
-    def search_files_by_content(self, directory: str, query: str) -> List[Dict[str, Any]]:
+    def search_files_by_content(self, directory: str, query: str, limit: int = None,
+                                filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search files in directory by content using AI analysis."""
-        return self.content_analyzer.search_files_by_content(directory, query)
+        return self.content_analyzer.search_files_by_content(directory, query, limit, self.parse_filters(filters))
+    
+    def iter_search_files_by_content(self, directory: str, query: str,
+                                     filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield relevant files in directory as soon as each one is confirmed."""
+        return self.content_analyzer.iter_search_files_by_content(directory, query, self.parse_filters(filters))
     
-    def organize_files_by_content(self, directory: str) -> Dict[str, Any]:
+    def organize_files_by_content(self, directory: str, dry_run: bool = False) -> Dict[str, Any]:
         """Organize files in directory based on content analysis."""
-        return self.content_analyzer.organize_files_by_content(directory)
+        return self.content_analyzer.organize_files_by_content(directory, dry_run)
+    
+    def undo_organize(self, directory: str) -> Dict[str, Any]:
+        """Move the files of the last organize job in directory back."""
+        return self.content_analyzer.undo_organize(directory)
+    
+    def build_index(self, directory: str) -> Dict[str, Any]:
+        """Build or refresh the lexical and semantic search indexes for directory."""
+        return self.content_analyzer.build_index(directory)
+    
+    def watch(self, directory: str) -> IndexWatcher:
+        """Start keeping the catalog and indexes for directory current in the background."""
+        watcher = IndexWatcher(
+            self.content_analyzer,
+            directory,
+            debounce=self.config.watch_debounce,
+            max_delay=self.config.watch_max_delay
+        )
+        watcher.start()
+        self.content_analyzer.catalog = watcher
+        return watcher
+    
+    def scan_directory(self, directory: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+        """Scan directory and group files by category."""
+        return self.file_manager.scan_directory(directory, self.parse_filters(filters))
+    
+    def parse_filters(self, options: Optional[Dict[str, Any]]) -> MetadataFilter:
+        """Turn filter options ("types", "min_size", "max_size", "modified_after", "modified_before") into a filter."""
+        return MetadataFilter.from_options(options, self.file_manager.extension_categories)
+    
+    def find_duplicates(self, directory: str) -> Dict[str, Any]:
+        """Report duplicate file groups under directory and the bytes they waste."""
+        return self.content_analyzer.find_duplicates(directory)
     
     def detect_intent(self, query: str) -> str:
         """Detect user intent from query."""
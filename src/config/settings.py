@@ -28,17 +28,103 @@ class Config:
         
         # Set configuration attributes
         self.ollama_url = config_data.get("ollama_url", "http://localhost:11434")
+        self.ollama_backends = config_data.get("ollama_backends", [])
+        self.llm_max_retries = config_data.get("llm_max_retries", 2)
+        self.llm_retry_backoff = config_data.get("llm_retry_backoff", 0.5)
+        self.llm_breaker_failures = config_data.get("llm_breaker_failures", 3)
+        self.llm_breaker_cooldown = config_data.get("llm_breaker_cooldown", 30.0)
+        self.llm_health_check_interval = config_data.get("llm_health_check_interval", 30.0)
         self.model_name = config_data.get("model_name", "gemma3n:e2b")
         self.capabilities = config_data.get("capabilities", ["search", "organize", "summarize", "chat"])
+        self.intent_fast_path = config_data.get("intent_fast_path", True)
+        self.intent_memo_size = config_data.get("intent_memo_size", 256)
         self.file_categories = config_data.get("file_categories", self._get_default_categories())
+        self.workers = config_data.get("workers", 4)
+        self.request_timeout = config_data.get("request_timeout", 120)
+        self.keep_alive = config_data.get("keep_alive", "30m")
+        self.llm_warmup = config_data.get("llm_warmup", True)
+        self.relevance_streaming = config_data.get("relevance_streaming", True)
+        self.relevance_batch_size = config_data.get("relevance_batch_size", 8)
+        self.relevance_context_length = config_data.get("relevance_context_length", 4096)
+        self.search_chunk_size = config_data.get("search_chunk_size", 1000)
+        self.search_chunk_overlap = config_data.get("search_chunk_overlap", 200)
+        self.search_max_chunks = config_data.get("search_max_chunks", 8)
+        self.search_token_budget = config_data.get("search_token_budget", 200000)
+        self.organize_clusters = config_data.get("organize_clusters", 0)
+        self.organize_journal = config_data.get("organize_journal", True)
+        self.query_filters = config_data.get("query_filters", True)
+        self.embedding_model = config_data.get("embedding_model", "nomic-embed-text")
+        self.semantic_top_k = config_data.get("semantic_top_k", 20)
+        self.embedding_chunk_size = config_data.get("embedding_chunk_size", 1000)
+        self.embedding_max_chunks = config_data.get("embedding_max_chunks", 8)
+        self.lexical_top_n = config_data.get("lexical_top_n", 50)
+        self.watch_debounce = config_data.get("watch_debounce", 1.0)
+        self.watch_max_delay = config_data.get("watch_max_delay", 10.0)
+        self.scan_ignore = config_data.get("scan_ignore", ["__pycache__", "node_modules"])
+        self.scan_skip_hidden = config_data.get("scan_skip_hidden", True)
+        self.scan_max_depth = config_data.get("scan_max_depth")
+        self.scan_symlinks = config_data.get("scan_symlinks", "files")
+        self.scan_workers = config_data.get("scan_workers", 1)
+        self.extraction_processes = config_data.get("extraction_processes", 2)
+        self.extraction_cache_enabled = config_data.get("extraction_cache_enabled", True)
+        self.extraction_cache_max_entries = config_data.get("extraction_cache_max_entries", 10000)
+        self.index_max_chars = config_data.get("index_max_chars", 1000000)
+        self.dedup_enabled = config_data.get("dedup_enabled", True)
+        self.dedup_near_distance = config_data.get("dedup_near_distance", 5)
+        self.cache_dir = config_data.get("cache_dir", "~/.lfea/cache")
+        self.verdict_cache_enabled = config_data.get("verdict_cache_enabled", True)
+        self.verdict_cache_max_entries = config_data.get("verdict_cache_max_entries", 100000)
     
     def _get_default_config(self) -> Dict:
         """Get default configuration."""
         return {
             "ollama_url": "http://localhost:11434",
+            "ollama_backends": [],
+            "llm_max_retries": 2,
+            "llm_retry_backoff": 0.5,
+            "llm_breaker_failures": 3,
+            "llm_breaker_cooldown": 30.0,
+            "llm_health_check_interval": 30.0,
             "model_name": "gemma3n:e2b",
             "capabilities": ["search", "organize", "summarize", "chat"],
-            "file_categories": self._get_default_categories()
+            "intent_fast_path": True,
+            "intent_memo_size": 256,
+            "file_categories": self._get_default_categories(),
+            "workers": 4,
+            "request_timeout": 120,
+            "keep_alive": "30m",
+            "llm_warmup": True,
+            "relevance_streaming": True,
+            "relevance_batch_size": 8,
+            "relevance_context_length": 4096,
+            "search_chunk_size": 1000,
+            "search_chunk_overlap": 200,
+            "search_max_chunks": 8,
+            "search_token_budget": 200000,
+            "organize_clusters": 0,
+            "organize_journal": True,
+            "query_filters": True,
+            "embedding_model": "nomic-embed-text",
+            "semantic_top_k": 20,
+            "embedding_chunk_size": 1000,
+            "embedding_max_chunks": 8,
+            "lexical_top_n": 50,
+            "watch_debounce": 1.0,
+            "watch_max_delay": 10.0,
+            "scan_ignore": ["__pycache__", "node_modules"],
+            "scan_skip_hidden": True,
+            "scan_max_depth": None,
+            "scan_symlinks": "files",
+            "scan_workers": 1,
+            "extraction_processes": 2,
+            "extraction_cache_enabled": True,
+            "extraction_cache_max_entries": 10000,
+            "index_max_chars": 1000000,
+            "dedup_enabled": True,
+            "dedup_near_distance": 5,
+            "cache_dir": "~/.lfea/cache",
+            "verdict_cache_enabled": True,
+            "verdict_cache_max_entries": 100000
         }
     
     def _get_default_categories(self) -> Dict[str, List[str]]:
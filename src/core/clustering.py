@@ -0,0 +1,53 @@
+"""
+Vectorized clustering helpers for grouping document embeddings.
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+def suggest_cluster_count(n_items: int, max_clusters: int = 50) -> int:
+    """Pick a cluster count that grows slowly with the number of items."""
+    if n_items <= 1:
+        return n_items
+    return max(2, min(max_clusters, n_items, round(math.sqrt(n_items / 2))))
+
+def kmeans(matrix: np.ndarray, k: int, iterations: int = 30, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means over unit-length rows.
+
+    Returns (labels, centroids). Initialization uses k-means++ seeding with a fixed
+    seed, so the same input rows always produce the same clusters.
+    """
+    n_items = len(matrix)
+    k = min(k, n_items)
+    if k <= 1:
+        return np.zeros(n_items, dtype=np.int64), matrix.mean(axis=0, keepdims=True)
+
+    rng = np.random.default_rng(seed)
+    chosen = [int(rng.integers(n_items))]
+    distance = 1.0 - matrix @ matrix[chosen[0]]
+    for _ in range(1, k):
+        weights = np.clip(distance, 0.0, None) ** 2
+        total = weights.sum()
+        chosen.append(int(rng.choice(n_items, p=weights / total)) if total > 0 else int(rng.integers(n_items)))
+        distance = np.minimum(distance, 1.0 - matrix @ matrix[chosen[-1]])
+    centroids = matrix[chosen].copy()
+
+    labels = np.full(n_items, -1, dtype=np.int64)
+    for _ in range(iterations):
+        new_labels = np.argmax(matrix @ centroids.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, matrix)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Keep the previous centroid for clusters that lost all their members
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return labels, centroids
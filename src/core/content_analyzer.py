@@ -1,118 +1,1127 @@
+import errno
+import hashlib
+import json
 import os
+import re
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
 from datetime import datetime
 
+import numpy as np
+
+from .clustering import kmeans, normalize_rows, suggest_cluster_count
+from .dedup import DuplicateFinder, DuplicateTracker, simhash
+from .extractors import ContentExtractor, ExtractionError
+from .lexical_index import LexicalIndex
+from .metadata_catalog import MetadataCatalog
+from .organize_journal import OrganizeJournal
+from .query_filters import MetadataFilter, QueryFilterParser
+from .scanner import FileScanner, ScannedFile
+from .vector_index import VectorIndex
+from .verdict_cache import VerdictCache
+from ..llm.ollama_client import OllamaError
+from ..utils.concurrency import bounded_map
+from ..utils.metrics import metrics
+
+class _TokenBudget:
+    """Thread-safe allowance of prompt tokens for judging windows past a file's first."""
+    
+    def __init__(self, tokens: int):
+        self.remaining = tokens if tokens > 0 else None
+        self.exhausted = False
+        self._lock = threading.Lock()
+    
+    def spend(self, tokens: int) -> bool:
+        """Take tokens from the budget, or return False if it cannot cover them."""
+        if self.remaining is None:
+            return True
+        with self._lock:
+            if tokens > self.remaining:
+                self.exhausted = True
+                return False
+            self.remaining -= tokens
+            return True
+
 class ContentAnalyzer:
     """This class analyzes the files content using LLM"""
     
-    def __init__(self, llm_client):
+    PREVIEW_CHARS = 1000
+    BATCH_OVERHEAD_TOKENS = 120
+    BATCH_PER_FILE_TOKENS = 20
+    BATCH_RESPONSE_TOKENS_PER_FILE = 8
+    CLUSTER_SAMPLES = 3
+    PROMPT_OVERHEAD_TOKENS = 256
+    SNIPPET_CHARS = 240
+    MOVE_BATCH = 256
+    
+    def __init__(self, llm_client, verdict_cache: Optional[VerdictCache] = None, workers: int = 1,
+                 vector_index: Optional[VectorIndex] = None, semantic_top_k: int = 0,
+                 lexical_index: Optional[LexicalIndex] = None, lexical_top_n: int = 0,
+                 batch_size: int = 1, batch_context_length: int = 4096, organize_clusters: int = 0,
+                 scanner: Optional[FileScanner] = None, extractor: Optional[ContentExtractor] = None,
+                 index_max_chars: int = 1000000, stream_verdicts: bool = False,
+                 chunk_size: int = 1000, chunk_overlap: int = 200, max_chunks: int = 1,
+                 token_budget: int = 0, deduplicator: Optional[DuplicateFinder] = None,
+                 journal_dir: Optional[Path] = None, extension_categories: Optional[Dict[str, str]] = None,
+                 metadata_catalog: Optional[MetadataCatalog] = None, query_filters: bool = True):
         self.llm_client = llm_client
-        self.document_extensions = ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages']
+        self.verdict_cache = verdict_cache
+        self.workers = workers
+        self.vector_index = vector_index
+        self.semantic_top_k = semantic_top_k
+        self.lexical_index = lexical_index
+        self.lexical_top_n = lexical_top_n
+        self.batch_size = batch_size
+        self.batch_context_length = batch_context_length
+        self.organize_clusters = organize_clusters
+        self.scanner = scanner or FileScanner()
+        self.extractor = extractor or ContentExtractor(processes=0)
+        self.index_max_chars = index_max_chars
+        self.stream_verdicts = stream_verdicts
+        self.chunk_size = chunk_size
+        self.chunk_overlap = min(chunk_overlap, chunk_size // 2)
+        self.max_chunks = max(1, max_chunks)
+        self.token_budget = token_budget
+        self.deduplicator = deduplicator
+        self.journal_dir = Path(journal_dir).expanduser() if journal_dir else None
+        self.extension_categories = extension_categories or {}
+        self.metadata_catalog = metadata_catalog
+        self.query_parser = QueryFilterParser(self.extension_categories) if query_filters else None
+        # One fixed context size for single-window prompts, since changing num_ctx reloads the model
+        self.chunk_context_length = max(1024, self._estimate_tokens(" " * chunk_size) + self.PROMPT_OVERHEAD_TOKENS)
+        self.catalog = None
+        self.index_lock = threading.RLock()
+        # Relevance prompts from every search share these, so --workers bounds the requests in flight
+        self._llm_slots = threading.BoundedSemaphore(max(1, workers))
+        self._window_pool: Optional[ThreadPoolExecutor] = None
+        self._window_pool_lock = threading.Lock()
+        self.document_extensions = frozenset(['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'])
     
-    def search_files_by_content(self, directory: str, query: str) -> List[Dict[str, Any]]:
-        """Search files by content using the LLM analysis."""
+    def search_files_by_content(self, directory: str, query: str, limit: Optional[int] = None,
+                                filters: Optional[MetadataFilter] = None) -> List[Dict[str, Any]]:
+        """Search files by content using the LLM analysis.
+        
+        Stops after `limit` matches when given. Ctrl+C returns the matches found so far.
+        """
         results = []
+        matches = self.iter_search_files_by_content(directory, query, filters)
+        try:
+            for result in matches:
+                results.append(result)
+                if limit and len(results) >= limit:
+                    break
+        except KeyboardInterrupt:
+            print("\n⚠️  Search interrupted. Returning partial results.")
+        finally:
+            matches.close()
+        return results if results else [{"message": "No relevant files found."}]
+    
+    def iter_search_files_by_content(self, directory: str, query: str,
+                                     filters: Optional[MetadataFilter] = None) -> Iterator[Dict[str, Any]]:
+        """Yield each relevant file as soon as the LLM confirms it.
+        
+        Type, size and date constraints in `filters` or in the query itself are checked
+        against file metadata before anything is read or sent to the model. A query that
+        is nothing but such constraints matches every file that passes them.
+        Closing the generator stops the scan and cancels LLM calls that have not started.
+        """
+        found = 0
+        unjudged = 0
+        # Counted per search, since concurrent service requests share one verdict cache
+        cache_hits = cache_misses = 0
+        finished = False
+        budget = _TokenBudget(self.token_budget)
         print(f"\n🔍 Searching for '{query}' in directory: {directory}")
+        filters = filters or MetadataFilter()
+        if self.query_parser is not None:
+            parsed, remaining = self.query_parser.parse(query)
+            if parsed:
+                print(f"🧮 Query filters: {parsed.describe()}. Content query: '{remaining}'")
+                filters, query = filters.merge(parsed), remaining
+        # Only documents are searched, so a type that excludes all of them would leave nothing to judge
+        filters, dropped = filters.within(self.document_extensions, self.extension_categories)
+        for description in dropped:
+            print(f"🧮 Ignoring filter '{description}': search only reads documents "
+                  f"({', '.join(sorted(self.document_extensions))}).")
+        if dropped and not query and not filters:
+            print("\n📊 Search complete. Nothing left to search for.")
+            return
+        if filters and not query:
+            yield from self._iter_filter_matches(directory, filters)
+            return
+        candidates = self._iter_candidates(directory, query, filters)
         
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = Path(root) / file
-                file_extension = file_path.suffix.lower()
+        # Files are prepared and judged concurrently but reported in walk order
+        prepared = bounded_map(
+            lambda entry: self._prepare_for_query(entry, query),
+            candidates,
+            self.workers
+        )
+        if self.deduplicator is not None:
+            prepared_units = self._attach_duplicates(prepared, self.deduplicator.tracker(self.document_extensions))
+        else:
+            prepared_units = prepared
+        judged = bounded_map(
+            lambda unit: self._judge_batch(unit, query, budget),
+            self._iter_query_batches(prepared_units),
+            self.workers
+        )
+        outcomes = (outcome for unit in judged for outcome in unit)
+        # Verdicts of judged files, for the duplicates that arrive after them
+        verdicts: Dict[Path, Dict[str, Any]] = {}
+        try:
+            for outcome in outcomes:
+                file_path = outcome["path"]
+                if "duplicate_of" in outcome:
+                    representative = outcome["duplicate_of"]
+                    shared = verdicts.get(representative)
+                    if shared is None:
+                        # The representative could not be judged, so neither can its copy
+                        unjudged += 1
+                        continue
+                    if not shared["response"].upper().startswith("YES"):
+                        print(f"🧬 Duplicate of {representative} shares its rejection: {file_path}")
+                        continue
+                    if not outcome["identical"]:
+                        # A near copy's text differs, so the representative's passage may not be in it
+                        shared = {"response": shared["response"]}
+                    print(f"🧬 Duplicate of {representative} shares its relevance: {file_path}")
+                    found += 1
+                    yield dict(self._search_result(file_path, outcome["stat"], shared),
+                               duplicate_of=str(representative))
+                    continue
+                print(f"📄 Analyzed file: {file_path}")
+                if outcome.get("content_hash"):
+                    if outcome.get("cached"):
+                        cache_hits += 1
+                    else:
+                        cache_misses += 1
                 
-                if file_extension not in self.document_extensions:
-                    print(f"  ⏭️  Skipping non-document file: {file_path}")
+                if outcome.get("error"):
+                    print(f"  ⚠️  Could not read file: {file_path}")
+                    continue
+                if outcome.get("llm_error"):
+                    print(f"  ⚠️  Could not judge file: {outcome['llm_error']}")
+                    unjudged += 1
                     continue
                 
-                print(f"📄 Analyzing file: {file_path}")
+                ai_response = outcome["response"]
+                if self.deduplicator is not None:
+                    verdicts[file_path] = {key: outcome[key] for key in ("response", "offset", "snippet")
+                                           if key in outcome}
+                if outcome["cached"]:
+                    print(f"  🗄️  Cached verdict: {ai_response}")
                 
+                if ai_response.upper().startswith("YES"):
+                    print(f"  ✅ AI confirmed relevance: {file_path}")
+                    found += 1
+                    yield self._search_result(file_path, outcome["stat"], outcome)
+                elif ai_response.upper().startswith("NO"):
+                    print(f"  ❌ AI rejected relevance: {file_path}")
+            finished = True
+        finally:
+            judged.close()
+            prepared.close()
+            status = "complete" if finished else "stopped early"
+            print(f"\n📊 Search {status}. Found {found} relevant files.")
+            if unjudged:
+                print(f"⚠️  {unjudged} files could not be judged because no model backend answered. "
+                      f"Their verdicts were not cached, so the next search checks them again.")
+            if budget.exhausted:
+                print(f"💰 Token budget of {self.token_budget} was used up; "
+                      f"later files were only checked on their first window.")
+            if self.verdict_cache:
+                self.verdict_cache.flush()
+                print(f"🗄️  Verdict cache: {cache_hits} hits, {cache_misses} misses.")
+    
+    def _iter_filter_matches(self, directory: str, filters: MetadataFilter) -> Iterator[Dict[str, Any]]:
+        """Yield every document passing filters, without asking the model anything."""
+        found = 0
+        try:
+            for entry in self._filtered_documents(directory, filters):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    prompt = f"""
-Does the following file content contain information related to: "{query}"?
-
-File: {file_path.name}
-Content preview:
-{content[:1000]}
-
-Answer with only "YES" or "NO" ONLY, without any additional text.:
-"""
-                    ai_response = self.llm_client.query(prompt, 1024, 5)
-                    
-                    if ai_response.upper().startswith("YES"):
-                        print(f"  ✅ AI confirmed relevance: {file_path}")
-                        results.append({
-                            "file": str(file_path),
-                            "relevance": ai_response,
-                            "size": file_path.stat().st_size,
-                            "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                        })
-                    elif ai_response.upper().startswith("NO"):
-                        print(f"  ❌ AI rejected relevance: {file_path}")
-                        continue
-                
-                except (UnicodeDecodeError, FileNotFoundError):
-                    print(f"  ⚠️  Could not read file: {file_path}")
+                    result = self._search_result(entry.path, entry.stat(), {"response": "YES (matches the filters)"})
+                except OSError:
                     continue
+                found += 1
+                yield result
+        finally:
+            print(f"\n📊 Search complete. Found {found} files matching the filters.")
+    
+    @staticmethod
+    def _search_result(file_path: Path, stat_result, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result record for a relevant file."""
+        return {
+            "file": str(file_path),
+            "relevance": outcome["response"],
+            "size": stat_result.st_size,
+            "modified": datetime.fromtimestamp(stat_result.st_mtime).isoformat(),
+            "offset": outcome.get("offset", 0),
+            "snippet": outcome.get("snippet", "")
+        }
+    
+    def _collapse_duplicates(self, entries: List[ScannedFile],
+                             text_chars: int) -> Tuple[List[ScannedFile], Dict[Path, List[ScannedFile]]]:
+        """Keep one representative per duplicate group, in the original order.
         
-        print(f"\n📊 Search complete. Found {len(results)} relevant files.")
-        return results if results else [{"message": "No relevant files found."}]
+        Returns the representatives and a map from each representative to its copies.
+        """
+        groups = self.deduplicator.find(entries, text_chars, self.document_extensions)
+        by_path = {entry.path: entry for entry in entries}
+        copies, skipped = {}, set()
+        for group in groups:
+            representative, *others = group["files"]
+            copies[representative] = [by_path[path] for path in others]
+            skipped.update(others)
+        if skipped:
+            print(f"🧬 {len(skipped)} duplicate files will share the result of {len(copies)} representatives.")
+        return [entry for entry in entries if entry.path not in skipped], copies
+    
+    @staticmethod
+    def _attach_duplicates(items: Iterator[Dict[str, Any]], tracker: DuplicateTracker) -> Iterator[Dict[str, Any]]:
+        """Replace each prepared file that duplicates an earlier one with a reference to it.
+        
+        Runs on the ordered stream of prepared files, so the first file of a group is
+        always its representative and the search can report matches as they come.
+        """
+        for item in items:
+            if not item.get("error"):
+                match = tracker.add(item["path"], item["stat"], item.get("simhash"), item.get("content_hash"))
+                if match is not None:
+                    item = {"path": item["path"], "stat": item["stat"], "duplicate_of": match[0], "identical": match[1]}
+            yield item
+    
+    def find_duplicates(self, directory: str) -> Dict[str, Any]:
+        """Report exact and near-duplicate groups under directory and the bytes they waste."""
+        finder = self.deduplicator or DuplicateFinder(self.extractor)
+        print(f"🧬 Looking for duplicates in directory: {directory}")
+        entries = list(self.scanner.scan(directory))
+        groups = finder.find(entries, self._search_chars(), self.document_extensions)
+        groups.sort(key=lambda group: (-group["reclaimable"], str(group["files"][0])))
+        return {
+            "files": len(entries),
+            "groups": [dict(group, files=[str(path) for path in group["files"]]) for group in groups],
+            "duplicates": sum(len(group["files"]) - 1 for group in groups),
+            "reclaimable": sum(group["reclaimable"] for group in groups)
+        }
+    
+    def build_index(self, directory: str) -> Dict[str, Any]:
+        """Bring the lexical and vector indexes up to date for documents under directory."""
+        summary = {"indexed": 0, "unchanged": 0, "removed": 0, "errors": []}
+        if self.vector_index is None and self.lexical_index is None:
+            summary["errors"].append("No search index is configured.")
+            return summary
+        
+        print(f"🧭 Indexing documents in directory: {directory}")
+        scanned_at = time.time()
+        seen = set()
+        scanned: List[ScannedFile] = []
+        
+        def documents():
+            for entry in self._iter_documents(directory):
+                scanned.append(entry)
+                yield entry
+        
+        for outcome in bounded_map(self._prepare_index_update, documents(), self.workers):
+            path = outcome["path"]
+            seen.add(path)
+            if outcome.get("error"):
+                print(f"  ⚠️  {outcome['error']}")
+                summary["errors"].append(outcome["error"])
+            elif outcome.get("unchanged"):
+                summary["unchanged"] += 1
+            else:
+                self._apply_index_update(outcome)
+                print(f"  ✅ Indexed: {path}")
+                summary["indexed"] += 1
+        
+        # Forget files that disappeared since the last build
+        prefix = self._path_prefix(directory)
+        stale = set()
+        for index in (self.vector_index, self.lexical_index):
+            if index is not None:
+                stale.update(path for path in index.paths_under(prefix) if path not in seen)
+        for path in stale:
+            self.remove_from_indexes(path)
+        summary["removed"] = len(stale)
+        if self.metadata_catalog is not None:
+            with self.index_lock:
+                self.metadata_catalog.replace_under(directory, scanned, scanned_at)
+        
+        self.save_indexes()
+        summary["documents"] = sorted(seen)
+        print(f"\n📊 Indexing complete. {summary['indexed']} indexed, {summary['unchanged']} unchanged, "
+              f"{summary['removed']} removed.")
+        return summary
+    
+    def _prepare_index_update(self, entry: ScannedFile) -> Dict[str, Any]:
+        """Read and embed a stale document. Runs on worker threads, so it only computes."""
+        file_path = entry.path
+        path = str(file_path.resolve())
+        try:
+            stat_result = entry.stat()
+            vector_stale = self.vector_index is not None and not self.vector_index.is_current(path, stat_result)
+            lexical_stale = self.lexical_index is not None and not self.lexical_index.is_current(path, stat_result)
+            if not vector_stale and not lexical_stale:
+                return {"path": path, "unchanged": True}
+            
+            text = self.extractor.extract(file_path, stat_result, self.index_max_chars)
+            update = {"path": path, "stat": stat_result}
+            if lexical_stale:
+                update["text"] = text
+            if vector_stale:
+                update["offsets"], update["vectors"] = self.vector_index.embed_text(text, self.llm_client.embed)
+            return update
+        except (ExtractionError, OSError) as e:
+            return {"path": path, "error": f"Could not index file {file_path}: {e}"}
+    
+    def _apply_index_update(self, update: Dict[str, Any]):
+        """Write a prepared update into the indexes."""
+        with self.index_lock:
+            if "text" in update:
+                self.lexical_index.add_document(update["path"], update["stat"], update["text"])
+            if "vectors" in update:
+                self.vector_index.add_file(update["path"], update["stat"], update["offsets"], update["vectors"])
+    
+    def remove_from_indexes(self, path: str):
+        """Drop a file from every index."""
+        with self.index_lock:
+            if self.vector_index is not None:
+                self.vector_index.remove_file(path)
+            if self.lexical_index is not None:
+                self.lexical_index.remove_document(path)
+    
+    def save_indexes(self):
+        """Persist every index to disk."""
+        with self.index_lock:
+            if self.vector_index is not None:
+                self.vector_index.save()
+            if self.lexical_index is not None:
+                self.lexical_index.save()
+            if self.metadata_catalog is not None and len(self.metadata_catalog):
+                self.metadata_catalog.save()
+    
+    def _iter_candidates(self, directory: str, query: str, filters: Optional[MetadataFilter] = None):
+        """Yield files worth judging, narrowed by metadata filters and the search indexes.
+        
+        Filters are applied first, so the indexes only rank files that pass them.
+        Lexical (BM25) and semantic candidates are merged, lexical first, followed by
+        files the indexes have not seen at their current version. If neither index has
+        anything under directory, every file passing the filters (or the whole tree) is
+        judged instead.
+        """
+        prefix = self._path_prefix(directory)
+        candidates, consulted = [], []
+        selected, allowed = None, None
+        if filters:
+            selected = self._filtered_documents(directory, filters)
+            allowed = {str(entry.path.resolve()) for entry in selected}
+        
+        if self.lexical_index is not None and self.lexical_top_n and len(self.lexical_index):
+            consulted.append(self.lexical_index)
+            with self.index_lock:
+                hits = self.lexical_index.search(query, self.lexical_top_n, prefix=prefix, allowed=allowed)
+            if hits:
+                print(f"🔤 Lexical prefilter selected {len(hits)} candidate files.")
+                candidates.extend(hit["path"] for hit in hits)
+        
+        if self.vector_index is not None and self.semantic_top_k and len(self.vector_index):
+            query_vector = self.llm_client.embed(query)
+            if query_vector:
+                consulted.append(self.vector_index)
+                with self.index_lock:
+                    hits = self.vector_index.search(query_vector, self.semantic_top_k, prefix=prefix,
+                                                    allowed=allowed)
+                if hits:
+                    print(f"🧭 Semantic prefilter selected {len(hits)} candidate files.")
+                    candidates.extend(hit["path"] for hit in hits)
+        
+        if candidates:
+            candidates = list(dict.fromkeys(candidates))
+            for path in candidates:
+                yield ScannedFile(Path(path))
+            documents = selected if selected is not None else self._iter_documents(directory)
+            yield from self._iter_unindexed(documents, set(candidates), consulted)
+            return
+        
+        yield from selected if selected is not None else self._iter_documents(directory)
+    
+    def _iter_unindexed(self, entries: Iterable[ScannedFile], skip: Set[str], indexes: List[Any]) -> Iterator[ScannedFile]:
+        """Yield the entries that none of indexes holds at their current mtime and size."""
+        unindexed = 0
+        for entry in entries:
+            path = str(entry.path.resolve())
+            if path in skip:
+                continue
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            with self.index_lock:
+                current = any(index.is_current(path, stat_result) for index in indexes)
+            if not current:
+                unindexed += 1
+                yield entry
+        if unindexed:
+            print(f"🆕 {unindexed} files were new or changed since the last index run, so they were judged too.")
+    
+    def _filtered_documents(self, directory: str, filters: MetadataFilter) -> List[ScannedFile]:
+        """Documents under directory that pass filters, evaluated as masks over metadata columns.
+        
+        The saved catalog from the last index build narrows the set by type without a
+        walk, unless a watcher keeps a live list. If directory mtimes show files were
+        added or removed since it was built, the directory is walked again and the
+        catalog refreshed. Survivors are always checked against fresh stats, so files
+        edited in place are judged by their current size and mtime.
+        """
+        with metrics.span("search.filter"):
+            catalog = self.metadata_catalog
+            watched = self.catalog is not None and self.catalog.covers(directory)
+            if catalog is not None and not watched and catalog.covers(directory):
+                with self.index_lock:
+                    changed = catalog.changed_under(directory)
+                if changed:
+                    print(f"🧮 Files changed since the metadata catalog of {directory} was built; rescanning.")
+                    scanned_at = time.time()
+                    entries = list(self._iter_documents(directory))
+                    with self.index_lock:
+                        catalog.replace_under(directory, entries, scanned_at)
+                        if catalog.catalog_dir is not None:
+                            catalog.save()
+                else:
+                    # Sizes and mtimes may have changed in place, so only the type is taken from the catalog
+                    by_type = MetadataFilter()
+                    by_type.types = filters.types
+                    with self.index_lock:
+                        rows = catalog.select(by_type, directory)
+                        entries = [ScannedFile(Path(catalog.path(row))) for row in rows]
+            else:
+                entries = self._iter_documents(directory)
+            selected = MetadataCatalog.filter_entries(entries, filters, self.extension_categories)
+        print(f"🧮 Metadata filters ({filters.describe()}) kept {len(selected)} documents.")
+        return selected
+    
+    @staticmethod
+    def _path_prefix(directory: str) -> str:
+        """Absolute path prefix matching files below directory."""
+        return os.path.join(str(Path(directory).resolve()), "")
+    
+    def _iter_documents(self, directory: str, exclude: Optional[List[str]] = None) -> Iterator[ScannedFile]:
+        """Yield documents under directory, reporting how many other files were skipped.
+        
+        `exclude` lists absolute directory paths whose contents are left out.
+        """
+        if self.catalog is not None and self.catalog.covers(directory):
+            # A running watcher keeps the document list current, so skip the walk
+            excluded = tuple(os.path.join(folder, "") for folder in exclude or [])
+            for path in self.catalog.documents_under(directory):
+                if not (excluded and str(path).startswith(excluded)):
+                    yield ScannedFile(path)
+            return
+        
+        skipped = 0
+        
+        def count_skipped(count: int):
+            nonlocal skipped
+            skipped += count
+        
+        yield from self.scanner.scan(directory, self.document_extensions, exclude, on_skip=count_skipped)
+        if skipped:
+            print(f"  ⏭️  Skipped {skipped} non-document files.")
+    
+    def _prepare_for_query(self, entry: ScannedFile, query: str) -> Dict[str, Any]:
+        """Stat a file and look up its cached verdict, reading its windows only on a miss.
+        
+        With deduplication on, the text is always read so its SimHash can be taken.
+        Runs on worker threads, so it does not print.
+        """
+        file_path = entry.path
+        try:
+            stat_result = entry.stat()
+            item = {"path": file_path, "stat": stat_result, "content_hash": None}
+            if self.verdict_cache:
+                item["content_hash"] = self.verdict_cache.fingerprint(file_path, stat_result)
+                cached = self.verdict_cache.get(item["content_hash"], query, self._verdict_model())
+                if cached is not None:
+                    item.update(response=cached[0], cached=True, offset=cached[1])
+                    relevant = cached[0].upper().startswith("YES")
+                    wanted = cached[1] + self.chunk_size if relevant else 0
+                    if self.deduplicator is not None:
+                        wanted = max(wanted, self._search_chars())
+                    if wanted:
+                        text = self.extractor.extract(file_path, stat_result, wanted)
+                        if self.deduplicator is not None:
+                            item["simhash"] = simhash(text[:self._search_chars()])
+                        if relevant:
+                            item["snippet"] = self._snippet(text[cached[1]:cached[1] + self.chunk_size], query)
+                    return item
+            
+            text = self.extractor.extract(file_path, stat_result, self._search_chars())
+            if self.deduplicator is not None:
+                item["simhash"] = simhash(text)
+            item["chunks"] = self._chunk_windows(text)
+            item["preview"] = item["chunks"][0][1]
+            return item
+        except (ExtractionError, OSError):
+            return {"path": file_path, "error": True}
+    
+    def _search_chars(self) -> int:
+        """Characters covered by max_chunks overlapping windows."""
+        return self.chunk_size + (self.max_chunks - 1) * (self.chunk_size - self.chunk_overlap)
+    
+    def _chunk_windows(self, text: str) -> List[Tuple[int, str]]:
+        """Split text into overlapping (offset, window) pairs; the first window always exists."""
+        step = self.chunk_size - self.chunk_overlap
+        windows = [(0, text[:self.chunk_size])]
+        for offset in range(step, len(text) - self.chunk_overlap, step):
+            windows.append((offset, text[offset:offset + self.chunk_size]))
+        return windows[:self.max_chunks]
+    
+    def _snippet(self, window: str, query: str) -> str:
+        """Shorten a matching window for display, starting near the first query term it contains."""
+        text = " ".join(window.split())
+        lowered = text.lower()
+        positions = [lowered.find(term) for term in query.lower().split() if len(term) > 2]
+        positions = [position for position in positions if position >= 0]
+        start = max(0, min(positions) - self.SNIPPET_CHARS // 4) if positions else 0
+        snippet = text[start:start + self.SNIPPET_CHARS]
+        return ("…" if start else "") + snippet + ("…" if start + self.SNIPPET_CHARS < len(text) else "")
+    
+    def _verdict_model(self) -> str:
+        """Verdict cache key for the model, including the window layout when whole documents are scanned."""
+        if self.max_chunks <= 1:
+            return self.llm_client.model
+        return f"{self.llm_client.model}|windows={self.chunk_size}/{self.chunk_overlap}/{self.max_chunks}"
+    
+    def _iter_query_batches(self, items: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Group prepared files into units of LLM work, keeping the input order.
+        
+        Files that still need a verdict are packed together until the estimated prompt
+        would overflow the batch context window or reach batch_size files. Cached and
+        unreadable files pass through as single-item units that need no LLM call.
+        """
+        batch, budget = [], 0
+        available = self.batch_context_length - self.BATCH_OVERHEAD_TOKENS
+        for item in items:
+            if "preview" not in item:
+                if batch:
+                    yield batch
+                    batch, budget = [], 0
+                yield [item]
+                continue
+            
+            cost = self._estimate_tokens(item["preview"]) + self.BATCH_PER_FILE_TOKENS
+            if batch and (len(batch) >= self.batch_size or budget + cost > available):
+                yield batch
+                batch, budget = [], 0
+            batch.append(item)
+            budget += cost
+        if batch:
+            yield batch
     
-    def organize_files_by_content(self, directory: str) -> Dict[str, Any]:
-        """Organize files by content into categories based on the LLM analysis."""
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count for sizing prompts (about four characters per token)."""
+        return len(text) // 4 + 1
+    
+    def _judge_batch(self, items: List[Dict[str, Any]], query: str, budget: "_TokenBudget") -> List[Dict[str, Any]]:
+        """Get verdicts for a unit of prepared files. Runs on worker threads, so it does not print.
+        
+        First windows are judged together; a file rejected on its first window then has
+        its remaining windows judged until one of them is relevant.
+        """
+        pending = [item for item in items if "preview" in item]
+        if len(pending) > 1:
+            verdicts = self._query_batch_verdicts(pending, query)
+            for item in pending:
+                if item["path"] in verdicts:
+                    item.update(response=verdicts[item["path"]], cached=False)
+        
+        # Single files, and any file the batch answer did not cover, get their own prompt
+        for item in pending:
+            if "response" not in item:
+                with metrics.span("prompt_build"):
+                    prompt = self._build_relevance_prompt(item["path"].name, item["preview"], query)
+                try:
+                    item.update(response=self._ask_relevance(prompt), cached=False)
+                except OllamaError as e:
+                    item["llm_error"] = f"{item['path']}: {e}"
+        
+        for item in pending:
+            item.pop("preview")
+            chunks = item.pop("chunks")
+            if "llm_error" in item:
+                continue
+            item["offset"], complete = 0, True
+            if item["response"].upper().startswith("NO") and len(chunks) > 1:
+                complete = self._judge_remaining_windows(item, chunks, query, budget)
+            if item["response"].upper().startswith("YES"):
+                item["snippet"] = self._snippet(dict(chunks)[item["offset"]], query)
+            # Only definitive answers are cached; errors, rambling and budget-truncated NOs are retried
+            if not item["content_hash"] or not item["response"].upper().startswith(("YES", "NO")):
+                continue
+            if complete or item["response"].upper().startswith("YES"):
+                self.verdict_cache.put(item["content_hash"], query, self._verdict_model(),
+                                       item["response"], item["offset"])
+        return items
+    
+    def _judge_remaining_windows(self, item: Dict[str, Any], chunks: List[Tuple[int, str]], query: str,
+                                 budget: "_TokenBudget") -> bool:
+        """Judge windows after the first in parallel, stopping at the first relevant one.
+        
+        Updates item with the deciding response and offset. Returns False when the token
+        budget, a failed request or an unusable reply left some windows unjudged.
+        """
+        def judge(chunk: Tuple[int, str]) -> Tuple[int, Optional[str]]:
+            offset, window = chunk
+            with metrics.span("prompt_build"):
+                prompt = self._build_relevance_prompt(item["path"].name, window, query)
+            if not budget.spend(self._estimate_tokens(prompt)):
+                return offset, None
+            try:
+                return offset, self._ask_relevance(prompt)
+            except OllamaError:
+                return offset, None
+        
+        metrics.count("search_extra_windows", len(chunks) - 1)
+        results = bounded_map(judge, chunks[1:], self.workers, max_pending=self.workers,
+                              executor=self._windows_executor())
+        try:
+            for offset, response in results:
+                if response is None or not response.upper().startswith(("YES", "NO")):
+                    return False
+                if response.upper().startswith("YES"):
+                    item.update(response=response, offset=offset)
+                    return True
+        finally:
+            # Cancels windows that have not been sent yet
+            results.close()
+        return True
+    
+    def _windows_executor(self) -> ThreadPoolExecutor:
+        """The one pool that judges extra windows for all files, created on first use."""
+        with self._window_pool_lock:
+            if self._window_pool is None:
+                self._window_pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="lfea-window")
+            return self._window_pool
+    
+    def _ask_relevance(self, prompt: str) -> str:
+        """Send a single YES/NO relevance prompt, waiting for a free request slot."""
+        with self._llm_slots:
+            if self.stream_verdicts:
+                return self.llm_client.query_choice(prompt, ("YES", "NO"), self.chunk_context_length)
+            return self.llm_client.query(prompt, self.chunk_context_length, 5)
+    
+    def _query_batch_verdicts(self, items: List[Dict[str, Any]], query: str) -> Dict[Path, str]:
+        """Ask for verdicts on several files in one JSON-formatted request.
+        
+        Returns only the verdicts that parsed cleanly; an unusable reply or a failed
+        request yields an empty dict, so the files fall back to one prompt each.
+        """
+        with metrics.span("prompt_build"):
+            prompt = self._build_batch_prompt(items, query)
+        try:
+            with self._llm_slots:
+                response = self.llm_client.query(
+                    prompt,
+                    self.batch_context_length,
+                    self.BATCH_RESPONSE_TOKENS_PER_FILE * len(items) + 10,
+                    format="json"
+                )
+        except OllamaError:
+            return {}
+        try:
+            parsed = json.loads(response)
+        except ValueError:
+            metrics.count("batch_parse_failures")
+            return {}
+        if not isinstance(parsed, dict):
+            metrics.count("batch_parse_failures")
+            return {}
+        
+        verdicts = {}
+        for number, item in enumerate(items, 1):
+            answer = str(parsed.get(str(number), "")).strip().upper()
+            if answer.startswith(("YES", "NO")):
+                verdicts[item["path"]] = "YES" if answer.startswith("YES") else "NO"
+        return verdicts
+    
+    @staticmethod
+    def _build_batch_prompt(items: List[Dict[str, Any]], query: str) -> str:
+        """Build the multi-file prompt asking for a JSON verdict per file.
+        
+        The instruction and query come first and never change within a search, so
+        Ollama can reuse their KV cache across prompts; only the file sections differ.
+        """
+        sections = []
+        for number, item in enumerate(items, 1):
+            sections.append(f"[{number}] File: {item['path'].name}\nContent preview:\n{item['preview']}\n")
+        return f"""For each numbered file below, decide whether its content contains information related to: "{query}"
+Reply with ONLY a JSON object that maps every file number to "YES" or "NO", for example {{"1": "YES", "2": "NO"}}.
+
+{chr(10).join(sections)}
+JSON:"""
+    
+    @staticmethod
+    def _build_relevance_prompt(file_name: str, excerpt: str, query: str) -> str:
+        """Build the single-window YES/NO relevance prompt, with the shared instruction and query first."""
+        return f"""Does the following file content contain information related to: "{query}"?
+Answer with only "YES" or "NO" ONLY, without any additional text.
+
+File: {file_name}
+Content excerpt:
+{excerpt}
+
+Answer:"""
+    
+    def organize_files_by_content(self, directory: str, dry_run: bool = False) -> Dict[str, Any]:
+        """Organize files by content into categories based on the LLM analysis.
+        
+        Phase one embeds every document in parallel, clusters the embeddings and asks
+        the LLM once per cluster for a category name. Phase two applies the resulting
+        moves in batches, or only reports the plan when dry_run is set. With a journal,
+        embeddings, categories and moves are recorded as they happen: an interrupted job
+        resumes without repeating LLM calls, and earlier category folders are skipped.
+        """
+        directory = os.path.abspath(directory)
         print(f"🗂️ Organizing files in directory: {directory}")
-        organized_files = {"moved": [], "errors": []}
-        current_categories = []
+        organized_files = {"moved": [], "errors": [], "planned": []}
+        journal = self._open_journal(directory)
+        try:
+            if journal is not None and journal.status == OrganizeJournal.PLANNED:
+                return self._resume_moves(journal, organized_files, dry_run)
+            if journal is not None and journal.status != OrganizeJournal.CLASSIFYING:
+                journal.start()
+            self._plan_organize(directory, organized_files, journal)
+            
+            if dry_run:
+                print(f"\n📝 Dry run: planned {len(organized_files['planned'])} moves, no files were changed.")
+                return organized_files
+            if not organized_files["planned"]:
+                return organized_files
+            if journal is not None:
+                journal.record_plan(organized_files["planned"])
+                organized_files["planned"] = journal.moves()
+            self._apply_moves(organized_files, journal)
+            return organized_files
+        finally:
+            if journal is not None:
+                journal.close()
+    
+    def _plan_organize(self, directory: str, organized_files: Dict[str, Any], journal: Optional[OrganizeJournal]):
+        """Categorize the documents under directory and fill in organized_files["planned"]."""
+        documents = sorted(self._iter_documents(directory, journal.outputs() if journal is not None else None))
+        if not documents:
+            return
+        copies: Dict[Path, List[ScannedFile]] = {}
+        if self.deduplicator is not None:
+            documents, copies = self._collapse_duplicates(documents, self._search_chars())
         
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = Path(root) / file
-                file_extension = file_path.suffix.lower()
-                
-                if file_extension not in self.document_extensions:
-                    print(f"  ⏭️  Skipping non-document file: {file_path}")
-                    continue
-                
-                print(f"📄 Analyzing file: {file_path}")
-                
+        assignments, pending, journaled = [], documents, {}
+        if journal is not None:
+            pending = []
+            for entry in documents:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    prompt = f"ONLY REPLY WITH ONE WORD THE CATEGORY! Categorize the following content: {content[:1000]}"
-                    if current_categories:
-                        prompt += f"\n\nChoose one of these existing categories: {', '.join(current_categories)} only if applicable, otherwise create a new category."
-                    
-                    category = self.llm_client.query(prompt, 1024, 5).strip()
-                    print(f"  📂 Detected category: {category}")
-                    
-                    if category not in current_categories:
-                        current_categories.append(category)
-                    
-                    category_folder = Path(directory) / category
-                    category_folder.mkdir(parents=True, exist_ok=True)
-                    
+                    vector, category = journal.lookup(entry.path, entry.stat())
+                except OSError:
+                    vector, category = None, None
+                if category is not None:
+                    assignments.append((entry.path, category))
+                    continue
+                pending.append(entry)
+                if vector is not None:
+                    journaled[str(entry.path.resolve())] = vector
+            if assignments or journaled:
+                print(f"  ♻️  Resuming from the journal: {len(assignments)} files already categorized, "
+                      f"{len(journaled)} more already embedded.")
+        
+        if pending:
+            assignments.extend(self._categorize_documents(pending, journaled, organized_files, journal))
+        # Files whose category the model could not name stay where they are
+        failed = [path for path, category in assignments if category is None]
+        failed += [copy.path for path in failed for copy in copies.get(path, [])]
+        if failed:
+            print(f"  ⚠️  {len(failed)} files were left in place because no model backend answered.")
+            organized_files["errors"].extend(f"Could not categorize {path}: no model backend answered"
+                                             for path in failed)
+            assignments = [(path, category) for path, category in assignments if category is not None]
+        # Duplicates follow their representative into the same category
+        assignments.extend((copy.path, category) for path, category in list(assignments)
+                           for copy in copies.get(path, []))
+        
+        taken = set()
+        for file_path, category in sorted(assignments, key=lambda assignment: assignment[0]):
+            new_path = self._unique_destination(Path(directory) / category / file_path.name, file_path, taken)
+            organized_files["planned"].append({
+                "file": file_path.name,
+                "category": category,
+                "original_path": str(file_path),
+                "new_path": str(new_path)
+            })
+    
+    def _categorize_documents(self, documents: List[ScannedFile], journaled: Dict[str, np.ndarray],
+                              organized_files: Dict[str, Any],
+                              journal: Optional[OrganizeJournal]) -> List[Tuple[Path, Optional[str]]]:
+        """Embed, cluster and name documents, recording progress in the journal if there is one."""
+        print(f"🧭 Embedding {len(documents)} documents...")
+        indexed = self._indexed_document_vectors(documents)
+        if indexed:
+            print(f"  ♻️  Reusing whole-document embeddings of {len(indexed)} indexed files.")
+        indexed.update(journaled)
+        embedded, unembedded, stats = [], [], {}
+        for outcome in bounded_map(lambda entry: self._embed_for_organize(entry, indexed), documents, self.workers):
+            if outcome.get("error"):
+                print(f"  ⚠️  {outcome['error']}")
+                organized_files["errors"].append(outcome["error"])
+                continue
+            stats[outcome["path"]] = outcome["stat"]
+            if outcome.get("vector") is None:
+                unembedded.append(outcome)
+                continue
+            embedded.append(outcome)
+            if journal is not None and outcome["embedded_now"]:
+                journal.record_vector(outcome["path"], outcome["stat"], outcome["vector"])
+        
+        def record(path: Path, category: Optional[str]):
+            if journal is not None and category is not None:
+                journal.record_category(path, stats[path], category)
+        
+        assignments = self._categorize_by_clusters(embedded, record)
+        if unembedded:
+            # Without an embedding the file is categorized on its own, still in parallel
+            print(f"  ℹ️  {len(unembedded)} files could not be embedded; categorizing them individually.")
+            names = bounded_map(lambda item: self._try_name_category([item["preview"]]), unembedded, self.workers)
+            for item, name in zip(unembedded, names):
+                record(item["path"], name)
+                assignments.append((item["path"], name))
+        return assignments
+    
+    def _resume_moves(self, journal: OrganizeJournal, organized_files: Dict[str, Any],
+                      dry_run: bool) -> Dict[str, Any]:
+        """Finish the planned moves of an interrupted job without categorizing anything again."""
+        remaining = journal.moves(OrganizeJournal.PLANNED)
+        print(f"♻️  Resuming an interrupted organize job: {len(remaining)} of {len(journal.moves())} moves left.")
+        organized_files["planned"] = remaining
+        if dry_run:
+            print(f"\n📝 Dry run: {len(remaining)} moves still to apply, no files were changed.")
+            return organized_files
+        self._apply_moves(organized_files, journal)
+        return organized_files
+    
+    def undo_organize(self, directory: str) -> Dict[str, Any]:
+        """Move the files of the last organize job in directory back to where they were.
+        
+        Moves are undone newest first in journaled batches, so an interrupted undo can
+        be run again. Category folders left empty are removed.
+        """
+        directory = os.path.abspath(directory)
+        print(f"↩️  Undoing the last organize job in: {directory}")
+        result = {"restored": [], "errors": []}
+        journal = self._open_journal(directory)
+        if journal is None:
+            print("ℹ️ Organize journaling is disabled, so there is nothing to undo.")
+            return result
+        try:
+            moves = journal.moves(OrganizeJournal.MOVED)[::-1]
+            if not moves:
+                print("ℹ️ No organize job to undo.")
+            for start in range(0, len(moves), self.MOVE_BATCH):
+                done = []
+                for move in moves[start:start + self.MOVE_BATCH]:
                     try:
-                        shutil.move(str(file_path), str(category_folder / file))
-                        print(f"  ✅ Moved {file} to {category_folder}")
-                        organized_files["moved"].append({
-                            "file": file,
-                            "category": category,
-                            "original_path": str(file_path),
-                            "new_path": str(category_folder / file)
-                        })
-                    except Exception as move_error:
-                        error_msg = f"Failed to move {file}: {move_error}"
+                        if os.path.lexists(move["original_path"]):
+                            raise FileExistsError(f"{move['original_path']} already exists")
+                        Path(move["original_path"]).parent.mkdir(parents=True, exist_ok=True)
+                        with metrics.span("move"):
+                            self._move(move["new_path"], move["original_path"])
+                        result["restored"].append(move)
+                        done.append(move)
+                    except OSError as undo_error:
+                        error_msg = f"Failed to restore {move['file']}: {undo_error}"
                         print(f"  ❌ {error_msg}")
-                        organized_files["errors"].append(error_msg)
-                
-                except Exception as e:
-                    error_msg = f"Could not process file {file_path}: {e}"
-                    print(f"  ⚠️  {error_msg}")
-                    organized_files["errors"].append(error_msg)
+                        result["errors"].append(error_msg)
+                journal.mark(done, OrganizeJournal.UNDONE)
+            
+            removed = []
+            for folder in {str(Path(move["new_path"]).parent) for move in moves}:
+                try:
+                    os.rmdir(folder)
+                    removed.append(folder)
+                except OSError:
                     continue
+            journal.remove_outputs(removed)
+            if moves:
+                journal.set_status(OrganizeJournal.UNDONE)
+        finally:
+            journal.close()
+        return result
+    
+    def _open_journal(self, directory: str) -> Optional[OrganizeJournal]:
+        """Open the organize journal of an absolute directory path, if journaling is enabled."""
+        if self.journal_dir is None:
+            return None
+        digest = hashlib.blake2b(directory.encode("utf-8", "surrogateescape"), digest_size=8).hexdigest()
+        return OrganizeJournal(self.journal_dir / f"{digest}.sqlite3")
+    
+    @staticmethod
+    def _unique_destination(target: Path, source: Path, taken: set) -> Path:
+        """Pick a destination that neither overwrites an existing file nor another planned move."""
+        candidate, counter = target, 2
+        while candidate in taken or (candidate.exists() and candidate.resolve() != source.resolve()):
+            candidate = target.with_name(f"{target.stem} ({counter}){target.suffix}")
+            counter += 1
+        taken.add(candidate)
+        return candidate
+    
+    def _indexed_document_vectors(self, documents: List[ScannedFile]) -> Dict[str, np.ndarray]:
+        """Whole-document vectors from the semantic index for files indexed at their current version."""
+        if self.vector_index is None or not len(self.vector_index):
+            return {}
+        current = []
+        for entry in documents:
+            try:
+                path = str(entry.path.resolve())
+                if self.vector_index.is_current(path, entry.stat()):
+                    current.append(path)
+            except OSError:
+                continue
+        with self.index_lock:
+            return self.vector_index.document_vectors(current)
+    
+    def _embed_for_organize(self, entry: ScannedFile, indexed: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Read a preview and embed it unless the index already covers the whole document.
         
-        return organized_files
+        Runs on worker threads, so it does not print.
+        """
+        file_path = entry.path
+        try:
+            stat_result = entry.stat()
+            preview = self.extractor.extract(file_path, stat_result, self.PREVIEW_CHARS)
+        except (ExtractionError, OSError) as e:
+            return {"path": file_path, "error": f"Could not process file {file_path}: {e}"}
+        vector = indexed.get(str(file_path.resolve()))
+        embedded_now = vector is None
+        if embedded_now:
+            vector = self.llm_client.embed(preview)
+        return {"path": file_path, "stat": stat_result, "preview": preview, "vector": vector,
+                "embedded_now": embedded_now}
+    
+    def _categorize_by_clusters(self, embedded: List[Dict[str, Any]],
+                                record: Optional[Callable[[Path, Optional[str]], None]] = None
+                                ) -> List[Tuple[Path, Optional[str]]]:
+        """Cluster embedded documents and name each cluster with one LLM call.
+        
+        Members of a cluster that could not be named are assigned None. `record` is
+        called for every assignment as soon as its cluster is named.
+        """
+        if not embedded:
+            return []
+        
+        matrix = normalize_rows([item["vector"] for item in embedded])
+        k = self.organize_clusters or suggest_cluster_count(len(embedded))
+        labels, centroids = kmeans(matrix, k)
+        print(f"🧩 Grouped {len(embedded)} documents into {len(centroids)} clusters.")
+        
+        # Name each cluster from the members closest to its centroid
+        clusters = []
+        for cluster in range(len(centroids)):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                closest = members[np.argsort(-(matrix[members] @ centroids[cluster]))]
+                clusters.append((members, [embedded[i]["preview"] for i in closest[:self.CLUSTER_SAMPLES]]))
+        names = bounded_map(lambda cluster: self._try_name_category(cluster[1]), clusters, self.workers)
+        
+        assignments = []
+        for (members, _), name in zip(clusters, names):
+            if name is None:
+                print(f"  ⚠️  Could not name a cluster of {len(members)} files.")
+            else:
+                print(f"  📂 Cluster of {len(members)} files named: {name}")
+            for i in members:
+                if record is not None:
+                    record(embedded[i]["path"], name)
+                assignments.append((embedded[i]["path"], name))
+        return assignments
+    
+    def _name_category(self, previews: List[str]) -> str:
+        """Ask the LLM for a one-word category describing a group of previews."""
+        samples = "\n---\n".join(preview[:self.PREVIEW_CHARS // len(previews)] for preview in previews)
+        prompt = f"ONLY REPLY WITH ONE WORD THE CATEGORY! Categorize the following content: {samples}"
+        return self._sanitize_category(self.llm_client.query(prompt, 1024, 5))
+    
+    def _try_name_category(self, previews: List[str]) -> Optional[str]:
+        """Name a category, or return None when no model backend answered."""
+        try:
+            return self._name_category(previews)
+        except OllamaError:
+            return None
+    
+    @staticmethod
+    def _sanitize_category(response: str) -> str:
+        """Turn an LLM reply into a safe single-word folder name."""
+        words = re.findall(r"[\w-]+", response)
+        if not words:
+            return "Uncategorized"
+        return words[0].capitalize()
+    
+    def _apply_moves(self, organized_files: Dict[str, Any], journal: Optional[OrganizeJournal] = None):
+        """Create each category folder once and move every planned file into it, in batches.
+        
+        Renames within one filesystem only touch metadata, so they run before moves
+        that have to copy across devices. With a journal, each batch is marked done in
+        one transaction, and a move made just before an interruption is recognized.
+        """
+        moves = [move for move in organized_files["planned"] if move["original_path"] != move["new_path"]]
+        folders = {str(Path(move["new_path"]).parent) for move in moves}
+        for folder in folders:
+            Path(folder).mkdir(parents=True, exist_ok=True)
+        if journal is not None:
+            journal.add_outputs(folders)
+        
+        devices = {folder: os.stat(folder).st_dev for folder in folders}
+        def crosses_device(move: Dict[str, Any]) -> bool:
+            try:
+                return os.stat(move["original_path"]).st_dev != devices[str(Path(move["new_path"]).parent)]
+            except OSError:
+                return False
+        moves.sort(key=crosses_device)
+        
+        for start in range(0, len(moves), self.MOVE_BATCH):
+            done = []
+            for move in moves[start:start + self.MOVE_BATCH]:
+                source, target = move["original_path"], move["new_path"]
+                if journal is not None and not os.path.lexists(source) and os.path.lexists(target):
+                    # Moved before the job was interrupted, but not yet marked in the journal
+                    organized_files["moved"].append(move)
+                    done.append(move)
+                    continue
+                try:
+                    if os.path.lexists(target):
+                        raise FileExistsError(f"{target} already exists")
+                    with metrics.span("move"):
+                        self._move(source, target)
+                    print(f"  ✅ Moved {move['file']} to {Path(target).parent}")
+                    organized_files["moved"].append(move)
+                    done.append(move)
+                except Exception as move_error:
+                    error_msg = f"Failed to move {move['file']}: {move_error}"
+                    print(f"  ❌ {error_msg}")
+                    organized_files["errors"].append(error_msg)
+            if journal is not None:
+                journal.mark(done, OrganizeJournal.MOVED)
+        if journal is not None:
+            journal.set_status(OrganizeJournal.DONE)
+    
+    @staticmethod
+    def _move(source: str, target: str):
+        """Rename source to target, copying instead when they are on different filesystems."""
+        try:
+            os.rename(source, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(source, target)
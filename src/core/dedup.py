@@ -0,0 +1,315 @@
+"""
+Exact and near-duplicate detection by content fingerprints.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .extractors import ExtractionError
+from .scanner import ScannedFile
+from ..utils.metrics import metrics
+
+WORD_PATTERN = re.compile(r"\w+")
+_BIT_WEIGHTS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+def _sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def simhash(text: str, shingle_words: int = 3) -> Optional[int]:
+    """64-bit SimHash of the word shingles in text, or None if text is too short.
+
+    Uses Python's string hash, so values are only comparable within one process.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_words:
+        return None
+    shingles = {" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+    hashes = np.fromiter((hash(s) for s in shingles), dtype=np.int64, count=len(shingles)).view(np.uint64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    majority = bits.sum(axis=0) * 2 > len(hashes)
+    return int(_BIT_WEIGHTS[majority].sum())
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+class DuplicateFinder:
+    """Groups files with exact or near-duplicate content.
+
+    Exact duplicates are found in stages that each read more: files are bucketed by
+    size, then by a hash of their first bytes, and only files still colliding get a
+    full content hash. Near duplicates are SimHash fingerprints of word shingles within
+    `max_distance` bits of each other, found by banded LSH: with max_distance + 1 bands
+    any such pair agrees exactly on at least one band.
+    """
+
+    HEAD_BYTES = 65536
+
+    def __init__(self, extractor, hasher: Optional[Callable] = None, max_distance: int = 5):
+        self.extractor = extractor
+        self.hasher = hasher or (lambda path, stat_result: _sha256(path))
+        self.max_distance = max_distance
+
+    def find(self, entries: List[ScannedFile], text_chars: int = 100000,
+             near_extensions: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Return duplicate groups, each {"kind", "files", "sizes", "reclaimable"}.
+
+        Near duplicates are only looked for among files with `near_extensions` (all
+        files when None), using their first `text_chars` characters of text. Files in a
+        group are sorted, so the first one is a stable representative, and every member
+        is within `max_distance` bits of it. `kind` is "exact" when every member has
+        identical bytes and "near" otherwise. `reclaimable` counts bytes held by exact
+        extra copies.
+        """
+        entries = sorted(entries)
+        sizes = []
+        for entry in entries:
+            try:
+                sizes.append(entry.stat().st_size)
+            except OSError:
+                sizes.append(-1)
+
+        with metrics.span("dedup.exact"):
+            content_hashes = self._exact_hashes(entries, sizes)
+        union = _UnionFind(len(entries))
+        first_with_hash: Dict[str, int] = {}
+        for i, content_hash in content_hashes.items():
+            union.union(first_with_hash.setdefault(content_hash, i), i)
+
+        if self.max_distance > 0:
+            wanted = frozenset(near_extensions) if near_extensions is not None else None
+            with metrics.span("dedup.near"):
+                # Exact copies share a fingerprint, so only the first member of each is read
+                candidates = [i for i in range(len(entries))
+                              if sizes[i] > 0 and union.find(i) == i
+                              and (wanted is None or entries[i].path.suffix.lower() in wanted)]
+                neighbors: Dict[int, List[int]] = {}
+                for a, b in self._near_pairs(entries, candidates, text_chars):
+                    neighbors.setdefault(a, []).append(b)
+                    neighbors.setdefault(b, []).append(a)
+                # Nearness is not transitive: each group gathers only files close to its
+                # representative, so a chain of small edits never joins distant ends
+                grouped = set()
+                for i in candidates:
+                    if i in grouped or i not in neighbors:
+                        continue
+                    grouped.add(i)
+                    for j in neighbors[i]:
+                        if j not in grouped:
+                            grouped.add(j)
+                            union.union(i, j)
+
+        classes: Dict[int, List[int]] = {}
+        for i in range(len(entries)):
+            classes.setdefault(union.find(i), []).append(i)
+
+        groups = []
+        for members in classes.values():
+            if len(members) < 2:
+                continue
+            hashes = {content_hashes.get(i, i) for i in members}
+            reclaimable = 0
+            for content_hash in hashes:
+                copies = [i for i in members if content_hashes.get(i, i) == content_hash]
+                reclaimable += sizes[copies[0]] * (len(copies) - 1)
+            groups.append({
+                "kind": "exact" if len(hashes) == 1 else "near",
+                "files": [entries[i].path for i in members],
+                "sizes": [sizes[i] for i in members],
+                "reclaimable": reclaimable,
+            })
+        return groups
+
+    def tracker(self, near_extensions: Optional[Iterable[str]] = None) -> "DuplicateTracker":
+        """A tracker that groups files one at a time with this finder's hasher and distance."""
+        return DuplicateTracker(self.hasher, self.max_distance, near_extensions)
+
+    def _exact_hashes(self, entries: List[ScannedFile], sizes: List[int]) -> Dict[int, str]:
+        """Full content hashes of files that share a size and a head hash with another file."""
+        by_size: Dict[int, List[int]] = {}
+        for i, size in enumerate(sizes):
+            if size > 0:
+                by_size.setdefault(size, []).append(i)
+
+        content_hashes, heads = {}, {}
+        for same_size in by_size.values():
+            if len(same_size) < 2:
+                continue
+            by_head: Dict[str, List[int]] = {}
+            for i in same_size:
+                try:
+                    with open(entries[i].path, 'rb') as f:
+                        head = hashlib.blake2b(f.read(self.HEAD_BYTES), digest_size=16).hexdigest()
+                except OSError:
+                    continue
+                heads[i] = head
+                by_head.setdefault(head, []).append(i)
+            for same_head in by_head.values():
+                if len(same_head) < 2:
+                    continue
+                for i in same_head:
+                    # Small files were read whole, so their head hash is already a full hash
+                    if sizes[i] <= self.HEAD_BYTES:
+                        content_hashes[i] = heads[i]
+                        continue
+                    try:
+                        content_hashes[i] = self.hasher(entries[i].path, entries[i].stat())
+                    except OSError:
+                        continue
+        return content_hashes
+
+    def _near_pairs(self, entries: List[ScannedFile], candidates: List[int], text_chars: int):
+        """Yield index pairs whose SimHash fingerprints are within max_distance bits."""
+        fingerprints = {}
+        for i in candidates:
+            try:
+                text = self.extractor.extract(entries[i].path, entries[i].stat(), text_chars)
+            except (ExtractionError, OSError):
+                continue
+            fingerprint = simhash(text)
+            if fingerprint is not None:
+                fingerprints[i] = fingerprint
+
+        bands = self.max_distance + 1
+        width = 64 // bands
+        mask = (1 << width) - 1
+        seen = set()
+        for band in range(bands):
+            buckets: Dict[int, List[int]] = {}
+            for i, fingerprint in fingerprints.items():
+                buckets.setdefault((fingerprint >> (band * width)) & mask, []).append(i)
+            for bucket in buckets.values():
+                for x in range(len(bucket)):
+                    for y in range(x + 1, len(bucket)):
+                        pair = (bucket[x], bucket[y])
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        if bin(fingerprints[pair[0]] ^ fingerprints[pair[1]]).count("1") <= self.max_distance:
+                            yield pair
+
+class DuplicateTracker:
+    """Groups files into duplicates as they arrive, for pipelines that cannot wait for all of them.
+
+    The first file of a group is its representative. A later file joins it if it has
+    the same bytes, or, for `near_extensions`, if its SimHash is within `max_distance`
+    bits of the representative's. Contents are only hashed once two files share a
+    size, and representatives' fingerprints are kept in LSH bands, so each new file
+    is compared with a few candidates rather than with every earlier file.
+    """
+
+    def __init__(self, hasher: Callable, max_distance: int = 5, near_extensions: Optional[Iterable[str]] = None):
+        self.hasher = hasher
+        self.max_distance = max_distance
+        self.near_extensions = frozenset(near_extensions) if near_extensions is not None else None
+        # size -> content hash -> (representative, whether that content is the representative's own)
+        self._by_size: Dict[int, Dict[Optional[str], Tuple[Path, bool]]] = {}
+        # The first file of each size, hashed only once another file of that size arrives
+        self._unhashed: Dict[int, Tuple[Path, object, Optional[str]]] = {}
+        self._bands = max_distance + 1
+        self._width = 64 // self._bands
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, Path]]] = {}
+        self._fingerprints: Dict[Path, int] = {}
+        self._order: Dict[Path, int] = {}
+
+    def add(self, path: Path, stat_result, fingerprint: Optional[int],
+            content_hash: Optional[str] = None) -> Optional[Tuple[Path, bool]]:
+        """Record a file and return (representative, identical) if it duplicates an earlier one.
+
+        `fingerprint` is the SimHash of the file's text (None to skip near matching) and
+        `content_hash`, when already known, saves hashing the file.
+        """
+        match = self._exact(path, stat_result, content_hash)
+        if match is not None:
+            return match
+        near = self.near_extensions is None or path.suffix.lower() in self.near_extensions
+        if fingerprint is None or self.max_distance <= 0 or not near:
+            return None
+        representative = self._nearest(fingerprint)
+        if representative is not None:
+            self._register_content(path, stat_result, representative)
+            return representative, False
+        self._order[path] = len(self._order)
+        self._fingerprints[path] = fingerprint
+        mask = (1 << self._width) - 1
+        for band in range(self._bands):
+            self._buckets.setdefault((band, (fingerprint >> (band * self._width)) & mask), []).append(
+                (self._order[path], path))
+        return None
+
+    def _exact(self, path: Path, stat_result, content_hash: Optional[str]) -> Optional[Tuple[Path, bool]]:
+        """Match by content among files of the same size, hashing each of them at most once."""
+        size = stat_result.st_size
+        if size <= 0:
+            return None
+        contents = self._by_size.get(size)
+        if contents is None:
+            # Only a second file of this size makes hashing worthwhile
+            self._by_size[size] = {}
+            self._unhashed[size] = (path, stat_result, content_hash)
+            return None
+        first = self._unhashed.pop(size, None)
+        if first is not None:
+            first_hash = self._content_hash(*first)
+            if first_hash is not None:
+                contents[first_hash] = (first[0], True)
+        content_hash = self._content_hash(path, stat_result, content_hash)
+        if content_hash is None:
+            return None
+        if content_hash in contents:
+            return contents[content_hash]
+        contents[content_hash] = (path, True)
+        return None
+
+    def _register_content(self, path: Path, stat_result, representative: Path):
+        """Send later byte-identical copies of a near duplicate to its representative."""
+        size = stat_result.st_size
+        contents = self._by_size.get(size)
+        if contents is None:
+            return
+        for content_hash, (member, _) in list(contents.items()):
+            if member == path:
+                contents[content_hash] = (representative, False)
+        if self._unhashed.get(size, (None,))[0] == path:
+            content_hash = self._content_hash(*self._unhashed.pop(size))
+            if content_hash is not None:
+                contents[content_hash] = (representative, False)
+
+    def _content_hash(self, path: Path, stat_result, content_hash: Optional[str] = None) -> Optional[str]:
+        if content_hash is not None:
+            return content_hash
+        try:
+            return self.hasher(path, stat_result)
+        except OSError:
+            return None
+
+    def _nearest(self, fingerprint: int) -> Optional[Path]:
+        """The earliest representative within max_distance bits, found through the LSH bands."""
+        mask = (1 << self._width) - 1
+        best = None
+        for band in range(self._bands):
+            for order, candidate in self._buckets.get((band, (fingerprint >> (band * self._width)) & mask), ()):
+                if best is not None and order >= best[0]:
+                    continue
+                if bin(self._fingerprints[candidate] ^ fingerprint).count("1") <= self.max_distance:
+                    best = (order, candidate)
+        return best[1] if best is not None else None
@@ -0,0 +1,245 @@
+"""
+Pluggable, bounded-memory text extraction for documents.
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from ..utils.metrics import metrics
+
+class ExtractionError(Exception):
+    """Raised when text cannot be extracted from a file."""
+
+class TextExtractor:
+    """Reads plain text, never more than max_chars characters."""
+
+    extensions = ('.txt', '.rtf')
+    cpu_bound = False
+
+    def extract(self, path: Path, max_chars: int) -> str:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read(max_chars)
+        except UnicodeDecodeError as e:
+            raise ExtractionError(f"not valid UTF-8 text: {e}") from e
+
+class PdfExtractor:
+    """Extracts text page by page with pymupdf, stopping once max_chars are collected."""
+
+    extensions = ('.pdf',)
+    cpu_bound = True
+
+    def extract(self, path: Path, max_chars: int) -> str:
+        try:
+            import pymupdf
+        except ImportError as e:
+            raise ExtractionError("pymupdf is not installed") from e
+        parts, size = [], 0
+        try:
+            with pymupdf.open(str(path)) as document:
+                for page in document:
+                    text = page.get_text()
+                    parts.append(text)
+                    size += len(text)
+                    if size >= max_chars:
+                        break
+        except Exception as e:
+            raise ExtractionError(f"could not parse PDF: {e}") from e
+        return "".join(parts)[:max_chars]
+
+class DocxExtractor:
+    """Extracts paragraph text with python-docx, stopping once max_chars are collected."""
+
+    extensions = ('.docx',)
+    cpu_bound = True
+
+    def extract(self, path: Path, max_chars: int) -> str:
+        try:
+            import docx
+        except ImportError as e:
+            raise ExtractionError("python-docx is not installed") from e
+        parts, size = [], 0
+        try:
+            for paragraph in docx.Document(str(path)).paragraphs:
+                parts.append(paragraph.text)
+                size += len(paragraph.text) + 1
+                if size >= max_chars:
+                    break
+        except Exception as e:
+            raise ExtractionError(f"could not parse DOCX: {e}") from e
+        return "\n".join(parts)[:max_chars]
+
+def _run_extractor(extractor, path: Path, max_chars: int) -> str:
+    """Module-level entry point so extraction can run in a worker process."""
+    return extractor.extract(path, max_chars)
+
+class ExtractionCache:
+    """SQLite cache of extracted text keyed by path, mtime and size.
+
+    The least recently used entries are evicted once there are more than `max_entries`.
+    """
+
+    EVICT_EVERY = 100
+
+    def __init__(self, db_path: str, max_entries: int = 10000):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS extracted (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                max_chars INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_extracted_last_used ON extracted(last_used);
+        """)
+        self._conn.commit()
+
+    def get(self, path: Path, stat_result, max_chars: int) -> Optional[str]:
+        """Return cached text if it was extracted from this exact file version with enough characters."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, max_chars, text FROM extracted WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None or row[0] != stat_result.st_mtime_ns or row[1] != stat_result.st_size:
+            return None
+        # A shorter extraction still answers the request if it already covered the whole document
+        if row[2] < max_chars and len(row[3]) >= row[2]:
+            return None
+        with self._lock:
+            self._conn.execute("UPDATE extracted SET last_used = ? WHERE path = ?", (time.time(), str(path)))
+            self._mark_dirty()
+        return row[3][:max_chars]
+
+    def put(self, path: Path, stat_result, max_chars: int, text: str):
+        """Store extracted text for a file version."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted (path, mtime_ns, size, max_chars, text, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(path), stat_result.st_mtime_ns, stat_result.st_size, max_chars, text, time.time())
+            )
+            self._mark_dirty()
+            # Extraction is expensive to redo, so new text is committed right away
+            self._conn.commit()
+
+    def flush(self):
+        """Evict past the size cap and commit pending writes."""
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the database."""
+        self.flush()
+        self._conn.close()
+
+    def _mark_dirty(self):
+        """Count a write and periodically evict and commit. Caller holds the lock."""
+        self._pending += 1
+        if self._pending >= self.EVICT_EVERY:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def _evict(self):
+        """Remove least recently used entries beyond max_entries. Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM extracted").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM extracted WHERE rowid IN "
+                "(SELECT rowid FROM extracted ORDER BY last_used LIMIT ?)", (excess,)
+            )
+
+class ContentExtractor:
+    """Dispatches files to extractors by extension.
+
+    Plain text is read inline with a bounded read. CPU-heavy formats are parsed in a
+    process pool and their text is cached on disk, so repeat runs skip parsing.
+    """
+
+    def __init__(self, cache: Optional[ExtractionCache] = None, processes: int = 2):
+        self.cache = cache
+        self.processes = processes
+        self.default = TextExtractor()
+        self.extractors: Dict[str, object] = {}
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        for extractor in (self.default, PdfExtractor(), DocxExtractor()):
+            self.register(extractor)
+
+    def register(self, extractor, extensions: Optional[Iterable[str]] = None):
+        """Use extractor for the given extensions (default: the extractor's own list)."""
+        for extension in extensions or extractor.extensions:
+            self.extractors[extension.lower()] = extractor
+
+    def extract(self, path: Path, stat_result, max_chars: int) -> str:
+        """Return up to max_chars characters of text from path."""
+        with metrics.span("extract"):
+            return self._extract(path, stat_result, max_chars)
+
+    def _extract(self, path: Path, stat_result, max_chars: int) -> str:
+        extractor = self.extractors.get(path.suffix.lower(), self.default)
+        if not extractor.cpu_bound:
+            return extractor.extract(path, max_chars)
+
+        key = path.resolve()
+        if self.cache:
+            cached = self.cache.get(key, stat_result, max_chars)
+            if cached is not None:
+                metrics.count("extraction_cache_hits")
+                return cached
+            metrics.count("extraction_cache_misses")
+
+        pool = self._get_pool()
+        if pool is None:
+            text = extractor.extract(path, max_chars)
+        else:
+            try:
+                text = pool.submit(_run_extractor, extractor, path, max_chars).result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. a parser crashed on a malformed file); later files get a fresh pool
+                self._discard_pool(pool)
+                metrics.count("extraction_pool_restarts")
+                raise ExtractionError(f"extraction worker crashed: {e}") from e
+
+        if self.cache:
+            self.cache.put(key, stat_result, max_chars, text)
+        return text
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Start the process pool on first use."""
+        if self.processes <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool, unless another thread already replaced it."""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Shut down the process pool and close the cache."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.cache:
+            self.cache.close()
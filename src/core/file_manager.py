@@ -2,43 +2,43 @@
 File management utilities and helpers.
 """
 
-import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from .metadata_catalog import MetadataCatalog
+from .query_filters import MetadataFilter
+from .scanner import FileScanner
 
 class FileManager:
     """Manages file operations and categorization."""
     
-    def __init__(self, file_categories: Dict[str, List[str]]):
+    def __init__(self, file_categories: Dict[str, List[str]], scanner: Optional[FileScanner] = None):
         self.file_categories = file_categories
+        self.scanner = scanner or FileScanner()
+        # Extension lookups happen once per file, so precompute them; the first category listing an extension wins
+        self.extension_categories: Dict[str, str] = {}
+        for category, extensions in file_categories.items():
+            for extension in extensions:
+                self.extension_categories.setdefault(extension.lower(), category)
     
     def get_file_category(self, file_path: str) -> str:
         """Get the category of a file based on its extension."""
         extension = Path(file_path).suffix.lower()
-        
-        for category, extensions in self.file_categories.items():
-            if extension in extensions:
-                return category
-        
-        return "unknown"
+        return self.extension_categories.get(extension, "unknown")
     
     def is_document(self, file_path: str) -> bool:
         """Check if file is a document type."""
-        extension = Path(file_path).suffix.lower()
-        return extension in self.file_categories.get('documents', [])
+        return self.get_file_category(file_path) == 'documents'
     
-    def scan_directory(self, directory: str) -> Dict[str, List[str]]:
-        """Scan directory and categorize files by type."""
+    def scan_directory(self, directory: str, filters: Optional[MetadataFilter] = None) -> Dict[str, List[str]]:
+        """Scan directory and categorize files by type, keeping only files that pass filters."""
         categorized_files = {}
+        entries = self.scanner.scan(directory)
+        if filters:
+            entries = MetadataCatalog.filter_entries(entries, filters, self.extension_categories)
         
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = Path(root) / file
-                category = self.get_file_category(str(file_path))
-                
-                if category not in categorized_files:
-                    categorized_files[category] = []
-                
-                categorized_files[category].append(str(file_path))
+        for entry in entries:
+            category = self.get_file_category(entry.path.name)
+            categorized_files.setdefault(category, []).append(str(entry.path))
         
         return categorized_files
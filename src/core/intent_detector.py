@@ -1,14 +1,148 @@
-from typing import List
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.metrics import metrics
+
+# Trigger phrases for the built-in capabilities; any other capability matches on its own name
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "search": ["search", "find", "look for", "looking for", "locate", "where is", "where are",
+               "which files", "grep", "files about", "files containing", "files mentioning"],
+    "organize": ["organize", "organise", "sort", "tidy", "clean up", "categorize", "categorise",
+                 "arrange", "group files", "put into folders", "declutter"],
+    "summarize": ["summarize", "summarise", "summary", "tldr", "tl;dr", "overview of", "gist of"],
+    "chat": ["hi", "hello", "hey", "thanks", "thank you", "how are you", "who are you",
+             "what can you do", "good morning", "good evening"],
+}
+
+# Example requests for the nearest-centroid fallback
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "search": ["show me documents about taxes", "I need the contract with acme",
+               "get me my meeting notes", "any documents on the budget", "pdfs about invoices"],
+    "organize": ["put my downloads in order", "move files into category folders",
+                 "my desktop is a mess", "separate the files by type"],
+    "summarize": ["give me the main points of this report", "what does this document say",
+                  "shorten this text", "key takeaways of the paper"],
+    "chat": ["tell me a joke", "what is the weather like", "explain what you are",
+             "can we talk", "nice to meet you"],
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
 
 class IntentDetector:
-    """Detects user intent from natural language queries using the LLM."""
-    
-    def __init__(self, llm_client, capabilities: List[str]):
+    """Detects user intent from natural language queries using the LLM.
+
+    Obvious requests are answered locally: first from a memo of recent queries, then
+    by keyword rules built from the capabilities, then by a bag-of-words
+    nearest-centroid model. Only ambiguous inputs reach the LLM. `last_path` records
+    which of "memo", "rules", "centroid" or "llm" produced the latest answer.
+    """
+
+    CENTROID_THRESHOLD = 0.35
+    CENTROID_MARGIN = 0.1
+
+    def __init__(self, llm_client, capabilities: List[str], fast_path: bool = True, memo_size: int = 256):
         self.llm_client = llm_client
         self.capabilities = capabilities
-    
+        self.fast_path = fast_path
+        self.memo_size = memo_size
+        self.last_path: Optional[str] = None
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._rules = self._build_rules(capabilities)
+        self._vocabulary, self._labels, self._centroids = self._build_centroids(capabilities)
+
+    @staticmethod
+    def _build_rules(capabilities: List[str]) -> Dict[str, re.Pattern]:
+        """Compile one word-boundary regex of trigger phrases per capability."""
+        rules = {}
+        for capability in capabilities:
+            phrases = INTENT_KEYWORDS.get(capability, []) + [capability]
+            alternatives = "|".join(re.escape(phrase) for phrase in sorted(set(phrases), key=len, reverse=True))
+            rules[capability] = re.compile(rf"(?<![\w])(?:{alternatives})(?![\w])")
+        return rules
+
+    @staticmethod
+    def _build_centroids(capabilities: List[str]) -> Tuple[Dict[str, int], List[str], np.ndarray]:
+        """Build a vocabulary and one normalized bag-of-words centroid per capability."""
+        labels = [c for c in capabilities if c in INTENT_EXAMPLES]
+        documents = {c: INTENT_EXAMPLES[c] + INTENT_KEYWORDS.get(c, []) for c in labels}
+        vocabulary: Dict[str, int] = {}
+        for texts in documents.values():
+            for text in texts:
+                for token in TOKEN_PATTERN.findall(text):
+                    vocabulary.setdefault(token, len(vocabulary))
+
+        centroids = np.zeros((len(labels), len(vocabulary)), dtype=np.float32)
+        for row, label in enumerate(labels):
+            for text in documents[label]:
+                for token in TOKEN_PATTERN.findall(text):
+                    centroids[row, vocabulary[token]] += 1.0
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        return vocabulary, labels, centroids
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
     def detect_intent(self, query: str) -> str:
         """Detect intent from user query."""
+        normalized = self._normalize(query)
+        intent, path = None, None
+
+        if self.fast_path:
+            if normalized in self._memo:
+                self._memo.move_to_end(normalized)
+                intent, path = self._memo[normalized], "memo"
+            else:
+                intent = self._match_rules(normalized)
+                path = "rules"
+                if intent is None:
+                    intent = self._match_centroid(normalized)
+                    path = "centroid"
+
+        if intent is None:
+            intent, path = self._detect_with_llm(query), "llm"
+
+        if path != "memo" and self.memo_size:
+            self._memo[normalized] = intent
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+        self.last_path = path
+        metrics.count(f"intent_{path}")
+        print(f"🤖 Detected intent: {intent} (via {path})")
+        return intent
+
+    def _match_rules(self, normalized: str) -> Optional[str]:
+        """Return the only capability whose trigger phrases occur in the query, if exactly one does."""
+        matches = [capability for capability, rule in self._rules.items() if rule.search(normalized)]
+        return matches[0] if len(matches) == 1 else None
+
+    def _match_centroid(self, normalized: str) -> Optional[str]:
+        """Return the nearest capability centroid if it wins clearly, otherwise None."""
+        if not self._labels:
+            return None
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(normalized):
+            index = self._vocabulary.get(token)
+            if index is not None:
+                vector[index] += 1.0
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+
+        scores = self._centroids @ (vector / norm)
+        order = np.argsort(-scores)
+        best = scores[order[0]]
+        runner_up = scores[order[1]] if len(order) > 1 else 0.0
+        if best >= self.CENTROID_THRESHOLD and best - runner_up >= self.CENTROID_MARGIN:
+            return self._labels[order[0]]
+        return None
+
+    def _detect_with_llm(self, query: str) -> str:
+        """Ask the LLM to classify the query. Raises OllamaError, so a failure is never memoized."""
         prompt = f"""
         Detect the intent of the following query: "{query}"
 
@@ -18,12 +152,10 @@ class IntentDetector:
 
         Query: {query}
         Intent:"""
-        
+
         response = self.llm_client.query(prompt, 1024, 5)
         detected_intent = response.strip().lower()
-        
-        print(f"🤖 Detected intent: {detected_intent}")
-        
+
         # Validate that the response is one of our capabilities
         if detected_intent in self.capabilities:
             return detected_intent
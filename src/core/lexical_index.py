@@ -0,0 +1,137 @@
+"""
+Lexical inverted index with BM25 ranking.
+"""
+
+import heapq
+import math
+import os
+import pickle
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were with "
+    "about any all file files find me my show some what which".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms, dropping stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+class LexicalIndex:
+    """Inverted index of term -> {doc id: term frequency}, persisted as a pickle."""
+
+    INDEX_FILE = "lexical.pkl"
+
+    def __init__(self, index_dir: str, k1: float = 1.5, b: float = 0.75):
+        self.index_dir = Path(index_dir).expanduser()
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Dict] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+        self._total_length = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _load(self):
+        """Load a previously saved index."""
+        index_path = self.index_dir / self.INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, 'rb') as f:
+            state = pickle.load(f)
+        self._postings = state["postings"]
+        self._docs = state["docs"]
+        self._next_id = state["next_id"]
+        self._ids = {doc["path"]: doc_id for doc_id, doc in self._docs.items()}
+        self._total_length = sum(doc["length"] for doc in self._docs.values())
+
+    def save(self):
+        """Write the index to disk atomically."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_dir / (self.INDEX_FILE + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"postings": self._postings, "docs": self._docs, "next_id": self._next_id},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.index_dir / self.INDEX_FILE)
+
+    def is_current(self, path: str, stat_result) -> bool:
+        """Check whether a file is indexed at its current mtime and size."""
+        doc_id = self._ids.get(path)
+        if doc_id is None:
+            return False
+        doc = self._docs[doc_id]
+        return doc["mtime_ns"] == stat_result.st_mtime_ns and doc["size"] == stat_result.st_size
+
+    def add_document(self, path: str, stat_result, text: str):
+        """Index (or reindex) one document."""
+        self.remove_document(path)
+        counts = Counter(tokenize(text))
+        doc_id = self._next_id
+        self._next_id += 1
+
+        length = sum(counts.values())
+        self._docs[doc_id] = {
+            "path": path,
+            "length": length,
+            "mtime_ns": stat_result.st_mtime_ns,
+            "size": stat_result.st_size,
+            "terms": list(counts),
+        }
+        self._ids[path] = doc_id
+        self._total_length += length
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove_document(self, path: str):
+        """Drop a document and its postings."""
+        doc_id = self._ids.pop(path, None)
+        if doc_id is None:
+            return
+        doc = self._docs.pop(doc_id)
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def paths_under(self, prefix: str) -> List[str]:
+        """List indexed file paths below a directory prefix."""
+        return [path for path in self._ids if path.startswith(prefix)]
+
+    def search(self, query: str, top_n: int, prefix: Optional[str] = None,
+               allowed: Optional[Set[str]] = None) -> List[Dict]:
+        """Rank documents containing any query term by BM25 and return the best top_n.
+
+        `allowed`, when given, restricts the ranking to those paths.
+        """
+        if not self._docs or not top_n:
+            return []
+
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._docs[doc_id]["length"] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if prefix:
+            scores = {d: s for d, s in scores.items() if self._docs[d]["path"].startswith(prefix)}
+        if allowed is not None:
+            scores = {d: s for d, s in scores.items() if self._docs[d]["path"] in allowed}
+        best = heapq.nlargest(top_n, scores.items(), key=lambda item: item[1])
+        return [{"path": self._docs[doc_id]["path"], "score": score} for doc_id, score in best]
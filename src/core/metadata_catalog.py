@@ -0,0 +1,250 @@
+"""
+Compact columnar catalog of file metadata, filtered with vectorized masks.
+"""
+
+import os
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .query_filters import MetadataFilter
+from .scanner import ScannedFile
+
+def _pack(strings: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode strings as one byte blob plus offsets, so saving needs no pickle."""
+    encoded = [s.encode("utf-8", "surrogateescape") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8", "surrogateescape") for i in range(len(offsets) - 1)]
+
+class MetadataCatalog:
+    """Path, extension, size, mtime and inode of many files, stored column by column.
+
+    Each file costs a few dozen bytes: its directory and extension are small integer
+    codes into shared tables, its name lives in one byte blob, and the numeric fields
+    are NumPy arrays. New rows go into `array` buffers and are folded into the NumPy
+    columns on the next query. Categories are not stored; they are derived from the
+    extension code through `extension_categories` when a filter asks for them.
+    Each directory also remembers when it was last scanned, so a caller can tell from
+    directory mtimes whether files were added, renamed or removed since.
+    """
+
+    CATALOG_FILE = "catalog.npz"
+    _COLUMNS = (("dir_id", "i", np.int32), ("ext", "h", np.int16), ("size", "q", np.int64),
+                ("mtime", "d", np.float64), ("inode", "Q", np.uint64))
+
+    def __init__(self, extension_categories: Dict[str, str], catalog_dir: Optional[str] = None):
+        self.extension_categories = extension_categories
+        self.catalog_dir = Path(catalog_dir).expanduser() if catalog_dir else None
+        self.dirs: List[str] = []
+        self.dir_times: List[float] = []
+        self.extensions: List[str] = [""]
+        self.roots: List[str] = []
+        self._dir_codes: Dict[str, int] = {}
+        self._ext_codes: Dict[str, int] = {"": 0}
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, _, dtype in self._COLUMNS}
+        self._names = np.zeros(0, dtype=np.uint8)
+        self._name_offsets = np.zeros(1, dtype=np.int64)
+        self._reset_pending()
+        if self.catalog_dir is not None:
+            self._load()
+
+    @classmethod
+    def filter_entries(cls, entries: Iterable[ScannedFile], filters: Optional[MetadataFilter],
+                       extension_categories: Dict[str, str]) -> List[ScannedFile]:
+        """Return the scanned files that pass filters, using a transient catalog of their fresh stats."""
+        catalog = cls(extension_categories)
+        kept = []
+        for entry in entries:
+            try:
+                catalog.add(str(entry.path), entry.stat())
+            except OSError:
+                continue
+            kept.append(entry)
+        return [kept[row] for row in catalog.select(filters)]
+
+    def __len__(self) -> int:
+        return len(self._columns["size"]) + len(self._pending["size"])
+
+    def _reset_pending(self):
+        self._pending = {name: array(code) for name, code, _ in self._COLUMNS}
+        self._pending_names = bytearray()
+        self._pending_offsets = array("q")
+
+    def add(self, path: str, stat_result):
+        """Append one file."""
+        directory, name = os.path.split(path)
+        dir_id = self._dir_code(directory)
+        extension = os.path.splitext(name)[1].lower()
+        ext = self._ext_codes.get(extension)
+        if ext is None:
+            ext = self._ext_codes[extension] = len(self.extensions)
+            self.extensions.append(extension)
+        pending = self._pending
+        pending["dir_id"].append(dir_id)
+        pending["ext"].append(ext)
+        pending["size"].append(stat_result.st_size)
+        pending["mtime"].append(stat_result.st_mtime)
+        pending["inode"].append(stat_result.st_ino)
+        self._pending_names += name.encode("utf-8", "surrogateescape")
+        self._pending_offsets.append(len(self._pending_names))
+
+    def _dir_code(self, directory: str) -> int:
+        dir_id = self._dir_codes.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_codes[directory] = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_times.append(0.0)
+        return dir_id
+
+    def _freeze(self):
+        """Fold pending rows into the NumPy columns."""
+        if not len(self._pending["size"]):
+            return
+        for name, _, dtype in self._COLUMNS:
+            self._columns[name] = np.concatenate([self._columns[name], np.frombuffer(self._pending[name], dtype=dtype)])
+        base = self._name_offsets[-1]
+        self._names = np.concatenate([self._names, np.frombuffer(bytes(self._pending_names), dtype=np.uint8)])
+        self._name_offsets = np.concatenate(
+            [self._name_offsets, np.frombuffer(self._pending_offsets, dtype=np.int64) + base])
+        self._reset_pending()
+
+    def path(self, row: int) -> str:
+        """Full path of one row."""
+        self._freeze()
+        name = self._names[self._name_offsets[row]:self._name_offsets[row + 1]].tobytes()
+        return os.path.join(self.dirs[self._columns["dir_id"][row]], name.decode("utf-8", "surrogateescape"))
+
+    def _dirs_under(self, directory: str) -> np.ndarray:
+        """Mask over the directory table of directory and everything below it."""
+        prefix = os.path.join(os.path.abspath(directory), "")
+        return np.fromiter((os.path.join(d, "").startswith(prefix) for d in self.dirs),
+                           dtype=bool, count=len(self.dirs))
+
+    def _under(self, directory: str) -> np.ndarray:
+        """Mask of rows below directory, computed once per directory rather than per file."""
+        return self._dirs_under(directory)[self._columns["dir_id"]]
+
+    def select(self, filters: Optional[MetadataFilter], directory: Optional[str] = None) -> np.ndarray:
+        """Row numbers of files under directory that pass filters, in insertion order."""
+        self._freeze()
+        columns = self._columns
+        mask = self._under(directory) if directory else np.ones(len(columns["size"]), dtype=bool)
+        if filters:
+            for extensions, categories in filters.types:
+                # Decide per extension code, then broadcast the answer to every row
+                wanted = np.fromiter(
+                    (e in extensions or self.extension_categories.get(e, "unknown") in categories
+                     for e in self.extensions), dtype=bool, count=len(self.extensions))
+                mask &= wanted[columns["ext"]]
+            if filters.min_size is not None:
+                mask &= columns["size"] >= filters.min_size
+            if filters.max_size is not None:
+                mask &= columns["size"] <= filters.max_size
+            if filters.modified_after is not None:
+                mask &= columns["mtime"] >= filters.modified_after
+            if filters.modified_before is not None:
+                mask &= columns["mtime"] < filters.modified_before
+        return np.flatnonzero(mask)
+
+    def covers(self, directory: str) -> bool:
+        """Whether a catalogued root contains directory."""
+        path = os.path.join(os.path.abspath(directory), "")
+        return any(path.startswith(os.path.join(root, "")) for root in self.roots)
+
+    def changed_under(self, directory: str) -> bool:
+        """Whether entries were added, renamed or removed below directory since it was scanned.
+
+        Compares each catalogued directory's mtime with its scan time, which costs one
+        stat per directory. Files edited in place keep their directory's mtime, so
+        callers check survivors against fresh stats instead.
+        """
+        directory = os.path.abspath(directory)
+        if directory not in self._dir_codes:
+            return True
+        for dir_id in np.flatnonzero(self._dirs_under(directory)):
+            try:
+                if os.stat(self.dirs[dir_id]).st_mtime > self.dir_times[dir_id]:
+                    return True
+            except OSError:
+                # A removed directory also changed its parent's mtime
+                continue
+        return False
+
+    def replace_under(self, directory: str, entries: Iterable[ScannedFile], scanned_at: Optional[float] = None):
+        """Replace everything catalogued below directory with entries and mark it covered.
+
+        `scanned_at` is when the walk that produced entries started (default: now).
+        """
+        scanned_at = time.time() if scanned_at is None else scanned_at
+        self._freeze()
+        directory = os.path.abspath(directory)
+        keep = np.flatnonzero(~self._under(directory))
+        self._take(keep)
+        for entry in entries:
+            try:
+                self.add(str(entry.path), entry.stat())
+            except OSError:
+                continue
+        # Directories between directory and each file may hold no documents, but new files still show there
+        self._dir_code(directory)
+        prefix = os.path.join(directory, "")
+        for folder in list(self.dirs):
+            parent = os.path.dirname(folder)
+            while parent.startswith(prefix) and parent not in self._dir_codes:
+                self._dir_code(parent)
+                parent = os.path.dirname(parent)
+        for dir_id in np.flatnonzero(self._dirs_under(directory)):
+            self.dir_times[dir_id] = scanned_at
+        if not self.covers(directory):
+            prefix = os.path.join(directory, "")
+            self.roots = [root for root in self.roots if not os.path.join(root, "").startswith(prefix)] + [directory]
+
+    def _take(self, rows: np.ndarray):
+        """Keep only the given rows, compacting the name blob without a Python loop."""
+        for name in self._columns:
+            self._columns[name] = self._columns[name][rows]
+        starts = self._name_offsets[rows]
+        lengths = self._name_offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        self._names = self._names[np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])]
+        self._name_offsets = offsets
+
+    def _load(self):
+        """Load a previously saved catalog."""
+        catalog_path = self.catalog_dir / self.CATALOG_FILE
+        if not catalog_path.exists():
+            return
+        with np.load(catalog_path) as state:
+            for name, _, dtype in self._COLUMNS:
+                self._columns[name] = state[name].astype(dtype, copy=False)
+            self._names, self._name_offsets = state["names"], state["name_offsets"]
+            self.dirs = _unpack(state["dirs"], state["dir_offsets"])
+            self.extensions = _unpack(state["extensions"], state["extension_offsets"])
+            self.roots = _unpack(state["roots"], state["root_offsets"])
+            # Catalogs saved before scan times were kept count as never scanned
+            self.dir_times = (state["dir_times"].tolist() if "dir_times" in state.files
+                              else [0.0] * len(self.dirs))
+        self._dir_codes = {d: i for i, d in enumerate(self.dirs)}
+        self._ext_codes = {e: i for i, e in enumerate(self.extensions)}
+
+    def save(self):
+        """Write the catalog to disk atomically."""
+        self._freeze()
+        self.catalog_dir.mkdir(parents=True, exist_ok=True)
+        tables = {}
+        for key, strings in (("dirs", self.dirs), ("extensions", self.extensions), ("roots", self.roots)):
+            tables[key], tables[key[:-1] + "_offsets"] = _pack(strings)
+        tmp_path = self.catalog_dir / (self.CATALOG_FILE + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, names=self._names, name_offsets=self._name_offsets,
+                     dir_times=np.asarray(self.dir_times, dtype=np.float64), **self._columns, **tables)
+        os.replace(tmp_path, self.catalog_dir / self.CATALOG_FILE)
@@ -0,0 +1,197 @@
+"""
+Write-ahead journal of an organize job, so interrupted jobs resume and finished ones can be undone.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+class OrganizeJournal:
+    """SQLite journal of one directory's organize job.
+
+    Embeddings and categories are recorded as they are computed, keyed by path, size
+    and mtime, so a rerun of an interrupted job skips the LLM for files it already
+    classified. The full list of moves is committed before the first file is moved,
+    and each batch of completed moves is marked in one transaction. Category folders
+    are remembered across jobs so later runs do not reclassify organized files.
+    """
+
+    COMMIT_EVERY = 100
+    # Job states; PLANNED, MOVED and UNDONE are also the states of single moves
+    CLASSIFYING = "classifying"
+    PLANNED = "planned"
+    MOVED = "moved"
+    DONE = "done"
+    UNDONE = "undone"
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS job (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                vector BLOB,
+                category TEXT
+            );
+            CREATE TABLE IF NOT EXISTS moves (
+                seq INTEGER PRIMARY KEY,
+                file TEXT NOT NULL,
+                category TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS outputs (
+                folder TEXT PRIMARY KEY
+            );
+        """)
+        self._conn.commit()
+
+    @property
+    def status(self) -> Optional[str]:
+        """The job's state, or None if no job was ever started."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM job WHERE key = 'status'").fetchone()
+        return row[0] if row else None
+
+    def start(self):
+        """Begin a new job, forgetting earlier classifications.
+        
+        The previous job's moves are kept until the new job records its plan, so a run
+        that moves nothing does not lose the ability to undo the last one.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM files")
+            self._set("status", self.CLASSIFYING)
+            self._set("started", str(time.time()))
+            self._conn.commit()
+            self._pending = 0
+
+    def set_status(self, status: str):
+        """Record the job's state and commit everything pending."""
+        with self._lock:
+            self._set("status", status)
+            self._conn.commit()
+            self._pending = 0
+
+    def lookup(self, path: Path, stat_result) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Return the (vector, category) recorded for this exact file version."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, vector, category FROM files WHERE path = ?", (str(path),)
+            ).fetchone()
+        if row is None or row[0] != stat_result.st_mtime_ns or row[1] != stat_result.st_size:
+            return None, None
+        vector = np.frombuffer(row[2], dtype=np.float32) if row[2] is not None else None
+        return vector, row[3]
+
+    def record_vector(self, path: Path, stat_result, vector):
+        """Record a file's embedding."""
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO files (path, mtime_ns, size, vector) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size, "
+                "vector = excluded.vector",
+                (str(path), stat_result.st_mtime_ns, stat_result.st_size, blob)
+            )
+            self._mark_dirty()
+
+    def record_category(self, path: Path, stat_result, category: str):
+        """Record the category a file was assigned."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO files (path, mtime_ns, size, category) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size, "
+                "category = excluded.category",
+                (str(path), stat_result.st_mtime_ns, stat_result.st_size, category)
+            )
+            self._mark_dirty()
+
+    def record_plan(self, moves: List[Dict[str, Any]]):
+        """Durably record every planned move before any of them is applied."""
+        with self._lock:
+            self._conn.execute("DELETE FROM moves")
+            self._conn.executemany(
+                "INSERT INTO moves (seq, file, category, source, target, state) VALUES (?, ?, ?, ?, ?, ?)",
+                [(seq, move["file"], move["category"], move["original_path"], move["new_path"], self.PLANNED)
+                 for seq, move in enumerate(moves)]
+            )
+            self._set("status", self.PLANNED)
+            self._conn.commit()
+            self._pending = 0
+
+    def moves(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the job's moves in plan order, optionally only those in one state."""
+        query = "SELECT seq, file, category, source, target, state FROM moves"
+        args: Tuple = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            args = (state,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY seq", args).fetchall()
+        return [{"seq": seq, "file": file, "category": category, "original_path": source,
+                 "new_path": target, "state": move_state}
+                for seq, file, category, source, target, move_state in rows]
+
+    def mark(self, moves: Iterable[Dict[str, Any]], state: str):
+        """Set the state of a batch of moves in one transaction."""
+        with self._lock:
+            self._conn.executemany("UPDATE moves SET state = ? WHERE seq = ?",
+                                   [(state, move["seq"]) for move in moves])
+            self._conn.commit()
+            self._pending = 0
+
+    def add_outputs(self, folders: Iterable[str]):
+        """Remember category folders so later scans skip them."""
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO outputs (folder) VALUES (?)",
+                                   [(folder,) for folder in folders])
+            self._conn.commit()
+
+    def remove_outputs(self, folders: Iterable[str]):
+        """Forget category folders that no longer exist."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM outputs WHERE folder = ?", [(folder,) for folder in folders])
+            self._conn.commit()
+
+    def outputs(self) -> List[str]:
+        """Category folders created by this directory's organize jobs."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT folder FROM outputs")]
+
+    def flush(self):
+        """Commit pending writes."""
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the database."""
+        self.flush()
+        self._conn.close()
+
+    def _set(self, key: str, value: str):
+        """Store a job attribute. Caller holds the lock."""
+        self._conn.execute("INSERT OR REPLACE INTO job (key, value) VALUES (?, ?)", (key, value))
+
+    def _mark_dirty(self):
+        """Count a pending write and commit periodically. Caller holds the lock."""
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
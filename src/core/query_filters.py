@@ -0,0 +1,282 @@
+"""
+Structured metadata filters, parsed from search queries or command-line options.
+"""
+
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+SIZE_UNITS = {
+    "b": 1, "byte": 1, "bytes": 1,
+    "k": 1024, "kb": 1024, "kib": 1024,
+    "m": 1024 ** 2, "mb": 1024 ** 2, "mib": 1024 ** 2,
+    "g": 1024 ** 3, "gb": 1024 ** 3, "gib": 1024 ** 3,
+    "t": 1024 ** 4, "tb": 1024 ** 4, "tib": 1024 ** 4,
+}
+TIME_UNITS = {"d": 86400, "day": 86400, "w": 7 * 86400, "week": 7 * 86400,
+              "month": 30 * 86400, "y": 365 * 86400, "year": 365 * 86400}
+# Extensions that are also everyday words (or their abbreviations, like "docs") only count
+# as a filter when followed by "files"
+AMBIGUOUS_EXTENSIONS = {"doc", "log", "key", "pages", "numbers", "java", "zip", "rpm", "tar", "deb", "tiff",
+                        "bin", "dat", "jar", "pub", "tex", "art", "one", "go", "c", "rb", "js", "py"}
+# Other nouns for a category; like the category's own name, they need "files" after them
+CATEGORY_WORDS = {"images": ("photo", "picture"), "videos": ("movie",)}
+
+MIN_SIZE_WORDS = ("over", "above", "more than", "larger than", "bigger than", "greater than", "at least", ">", ">=")
+MAX_SIZE_WORDS = ("under", "below", "less than", "smaller than", "at most", "<", "<=")
+# Single letters ("5 m") are too often something else, so queries must spell out the unit
+_UNIT = r"(?P<unit>[kmgt]i?b|bytes?)"
+SIZE_PATTERN = re.compile(
+    r"(?<![\w<>])(?P<op>" + "|".join(re.escape(word) for word in MIN_SIZE_WORDS + MAX_SIZE_WORDS) + r")\s*"
+    r"(?P<number>\d+(?:\.\d+)?)\s*" + _UNIT + r"(?!\w)", re.IGNORECASE)
+# "last day" or "in 2019" are usually about the content, so relative dates need a verb
+_VERB = r"\b(?:modified|changed|updated|edited|created|saved)\s+"
+TIME_PATTERNS = [
+    ("rolling", re.compile(_VERB + r"\b(?:in\s+the\s+|within\s+the\s+)?(?:last|past)\s+(?:(?P<count>\d+)\s+)?"
+                           r"(?P<unit>day|week|month|year)s?\b", re.IGNORECASE)),
+    ("day", re.compile(_VERB + r"\b(?P<word>today|yesterday)\b", re.IGNORECASE)),
+    ("calendar", re.compile(_VERB + r"\bthis\s+(?P<unit>week|month|year)\b", re.IGNORECASE)),
+    ("date", re.compile(r"(?:" + _VERB + r")?"
+                        r"(?P<op>since|after|before|until|from)\s+(?P<date>\d{4}-\d{2}-\d{2})\b", re.IGNORECASE)),
+    ("year", re.compile(_VERB + r"\bin\s+(?P<year>(?:19|20)\d{2})\b", re.IGNORECASE)),
+    ("age", re.compile(r"\b(?P<op>older|newer)\s+than\s+(?P<count>\d+)\s+(?P<unit>day|week|month|year)s?\b",
+                       re.IGNORECASE)),
+]
+LEADING_FILLER = re.compile(
+    r"^(?:(?:find|search|show|list|get|give|me|for|all|any|my|the|files?|documents?|about|on|regarding|"
+    r"related\s+to|concerning|mentioning|with|that|which|are|is|of|and)\b[\s,]*)+", re.IGNORECASE)
+TRAILING_FILLER = re.compile(r"(?:[\s,]+(?:about|on|from|with|and|that|which|files?|documents?))+$", re.IGNORECASE)
+
+def parse_size(text: str) -> int:
+    """Parse a size such as "1.5MB", "200 kb" or "4096" into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*", str(text).lower())
+    if not match or (match.group(2) and match.group(2) not in SIZE_UNITS):
+        raise ValueError(f"Invalid size: {text!r} (use e.g. 500KB, 1.5MB or 2GB)")
+    return int(float(match.group(1)) * SIZE_UNITS.get(match.group(2) or "b"))
+
+def parse_time(text: str, now: Optional[float] = None) -> float:
+    """Parse an ISO date ("2024-05-01") or an age ("7d", "2w", "1y") into a Unix timestamp."""
+    now = time.time() if now is None else now
+    value = str(text).strip().lower()
+    match = re.fullmatch(r"(\d+)\s*(d|w|y|day|days|week|weeks|year|years)", value)
+    if match:
+        return now - int(match.group(1)) * TIME_UNITS[match.group(2).rstrip("s")]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid date: {text!r} (use YYYY-MM-DD or an age such as 7d, 2w or 1y)") from None
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class MetadataFilter:
+    """Constraints on a file's type, size and modification time.
+
+    A file passes a type group if it has one of the group's extensions or belongs to
+    one of its categories. Merged filters keep one group per source, and all groups
+    and bounds must hold. Times are Unix timestamps, sizes are bytes.
+    """
+
+    def __init__(self, extensions: Optional[Iterable[str]] = None, categories: Optional[Iterable[str]] = None,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 modified_after: Optional[float] = None, modified_before: Optional[float] = None):
+        self.types: List[Tuple[FrozenSet[str], FrozenSet[str]]] = []
+        self.add_types(extensions or [], categories or [])
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+
+    def __bool__(self) -> bool:
+        return bool(self.types) or any(
+            value is not None for value in (self.min_size, self.max_size, self.modified_after, self.modified_before))
+
+    def add_types(self, extensions: Iterable[str], categories: Iterable[str]):
+        """Require files to have one of extensions or to be in one of categories."""
+        group = (frozenset(self._dotted(e) for e in extensions), frozenset(categories))
+        if group[0] or group[1]:
+            self.types.append(group)
+
+    @staticmethod
+    def _dotted(extension: str) -> str:
+        extension = extension.lower()
+        return extension if extension.startswith(".") else f".{extension}"
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]], extension_categories: Dict[str, str]) -> "MetadataFilter":
+        """Build a filter from command-line or service options.
+
+        `types` lists extensions or category names ("pdf", ".docx", "images"); sizes
+        and times may be numbers or strings accepted by parse_size and parse_time.
+        """
+        options = options or {}
+        categories = set(extension_categories.values())
+        extensions, wanted_categories = set(), set()
+        for entry in options.get("types") or []:
+            for name in str(entry).split(","):
+                name = name.strip().lower()
+                if not name:
+                    continue
+                if name in categories or f"{name}s" in categories:
+                    wanted_categories.add(name if name in categories else f"{name}s")
+                else:
+                    extensions.add(name)
+
+        def size(key):
+            value = options.get(key)
+            return None if value is None else value if isinstance(value, int) else parse_size(value)
+
+        def moment(key):
+            value = options.get(key)
+            return None if value is None else float(value) if isinstance(value, (int, float)) else parse_time(value)
+
+        return cls(extensions, wanted_categories, size("min_size"), size("max_size"),
+                   moment("modified_after"), moment("modified_before"))
+
+    def merge(self, other: "MetadataFilter") -> "MetadataFilter":
+        """Combine two filters so that both must hold."""
+        def tightest(a, b, pick):
+            return b if a is None else a if b is None else pick(a, b)
+
+        merged = MetadataFilter()
+        merged.types = self.types + other.types
+        merged.min_size = tightest(self.min_size, other.min_size, max)
+        merged.max_size = tightest(self.max_size, other.max_size, min)
+        merged.modified_after = tightest(self.modified_after, other.modified_after, max)
+        merged.modified_before = tightest(self.modified_before, other.modified_before, min)
+        return merged
+
+    def within(self, extensions: Iterable[str],
+               extension_categories: Dict[str, str]) -> Tuple["MetadataFilter", List[str]]:
+        """Drop the type groups that no file with one of extensions could pass.
+
+        Returns the remaining filter and a description of each dropped group.
+        """
+        kept = self.merge(MetadataFilter())
+        kept.types, dropped = [], []
+        for group in self.types:
+            if any(extension in group[0] or extension_categories.get(extension, "unknown") in group[1]
+                   for extension in extensions):
+                kept.types.append(group)
+            else:
+                dropped.append(self._describe_types(group))
+        return kept, dropped
+
+    @staticmethod
+    def _describe_types(group: Tuple[FrozenSet[str], FrozenSet[str]]) -> str:
+        return "type " + "/".join(sorted(group[0]) + sorted(group[1]))
+
+    def describe(self) -> str:
+        """Summarize the filter for display."""
+        parts = [self._describe_types(group) for group in self.types]
+        if self.min_size is not None:
+            parts.append(f"size ≥ {_format_size(self.min_size)}")
+        if self.max_size is not None:
+            parts.append(f"size ≤ {_format_size(self.max_size)}")
+        if self.modified_after is not None:
+            parts.append(f"modified after {datetime.fromtimestamp(self.modified_after):%Y-%m-%d %H:%M}")
+        if self.modified_before is not None:
+            parts.append(f"modified before {datetime.fromtimestamp(self.modified_before):%Y-%m-%d %H:%M}")
+        return ", ".join(parts)
+
+class QueryFilterParser:
+    """Pulls type, size and date constraints out of a natural-language search query.
+
+    "PDFs modified last week larger than 1 MB about invoices" becomes a filter on
+    extension, mtime and size plus the content query "invoices". Only explicit phrasing
+    counts: categories need "files" ("image files"), relative dates need a verb
+    ("modified last week") and sizes need a byte unit, so "pictures of mango" or
+    "sales in 2019" stay content queries. "Last N units" and "older than N units" are
+    rolling windows (a month is 30 days); "today", "yesterday" and "this week/month/year"
+    follow the local calendar. Queries without any filter phrase are returned unchanged.
+    """
+
+    def __init__(self, extension_categories: Dict[str, str]):
+        names = sorted({extension.lstrip(".") for extension in extension_categories}, key=len, reverse=True)
+        plain = [name for name in names if len(name) > 2 and name not in AMBIGUOUS_EXTENSIONS]
+        self._extension_patterns = [
+            re.compile(r"(?<![\w.])\.?(?P<name>" + "|".join(map(re.escape, names)) + r")\s+files?\b", re.IGNORECASE),
+            re.compile(r"(?<![\w.])\.(?P<name>" + "|".join(map(re.escape, names)) + r")\b", re.IGNORECASE),
+        ]
+        if plain:
+            self._extension_patterns.append(re.compile(
+                r"(?<![\w.])(?P<name>" + "|".join(map(re.escape, plain)) + r")(?:s\b|\b)(?:\s+documents?\b)?",
+                re.IGNORECASE))
+        self._category_patterns = []
+        for category in sorted(set(extension_categories.values())):
+            nouns = [category[:-1] if category.endswith("s") else category, *CATEGORY_WORDS.get(category, ())]
+            pattern = r"\b(?:" + "|".join(map(re.escape, nouns)) + r")s?\s+files?\b"
+            self._category_patterns.append((category, re.compile(pattern, re.IGNORECASE)))
+
+    def parse(self, query: str, now: Optional[float] = None) -> Tuple[MetadataFilter, str]:
+        """Return the filter found in query and what is left of the query without it."""
+        now = time.time() if now is None else now
+        found = MetadataFilter()
+        extensions, categories = set(), set()
+        text = query
+
+        def take(pattern, handle):
+            nonlocal text
+            text = pattern.sub(lambda match: handle(match) or " ", text)
+
+        def on_size(match):
+            size = int(float(match.group("number")) * SIZE_UNITS[match.group("unit").lower()])
+            if match.group("op").lower() in MIN_SIZE_WORDS:
+                found.min_size = size
+            else:
+                found.max_size = size
+
+        take(SIZE_PATTERN, on_size)
+        for kind, pattern in TIME_PATTERNS:
+            take(pattern, lambda match, kind=kind: self._apply_time(found, kind, match, now))
+        for pattern in self._extension_patterns:
+            take(pattern, lambda match: extensions.add(match.group("name")))
+        for category, pattern in self._category_patterns:
+            take(pattern, lambda match, category=category: categories.add(category))
+        found.add_types(extensions, categories)
+
+        if not found:
+            return found, query
+        remaining = " ".join(text.split())
+        remaining = TRAILING_FILLER.sub("", LEADING_FILLER.sub("", remaining)).strip(" ,.;:")
+        return found, remaining
+
+    @staticmethod
+    def _apply_time(found: MetadataFilter, kind: str, match, now: float):
+        midnight = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        if kind == "rolling":
+            found.modified_after = now - int(match.group("count") or 1) * TIME_UNITS[match.group("unit").lower()]
+        elif kind == "day" and match.group("word").lower() == "today":
+            found.modified_after = midnight.timestamp()
+        elif kind == "day":
+            found.modified_after = (midnight - timedelta(days=1)).timestamp()
+            found.modified_before = midnight.timestamp()
+        elif kind == "calendar":
+            unit = match.group("unit").lower()
+            if unit == "week":
+                start = midnight - timedelta(days=midnight.weekday())
+            elif unit == "month":
+                start = midnight.replace(day=1)
+            else:
+                start = midnight.replace(month=1, day=1)
+            found.modified_after = start.timestamp()
+        elif kind == "date":
+            moment = datetime.fromisoformat(match.group("date")).timestamp()
+            if match.group("op").lower() in ("before", "until"):
+                found.modified_before = moment
+            else:
+                found.modified_after = moment
+        elif kind == "year":
+            year = int(match.group("year"))
+            found.modified_after = datetime(year, 1, 1).timestamp()
+            found.modified_before = datetime(year + 1, 1, 1).timestamp()
+        elif kind == "age":
+            moment = now - int(match.group("count")) * TIME_UNITS[match.group("unit").lower()]
+            if match.group("op").lower() == "older":
+                found.modified_before = moment
+            else:
+                found.modified_after = moment
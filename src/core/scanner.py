@@ -0,0 +1,140 @@
+"""
+Shared directory scanner built on os.scandir.
+"""
+
+import fnmatch
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from ..utils.metrics import metrics
+
+SYMLINK_POLICIES = ("skip", "files", "follow")
+
+class ScannedFile:
+    """A file found by the scanner. stat() reuses the DirEntry's cached result."""
+
+    __slots__ = ("path", "_entry", "_stat", "_follow")
+
+    def __init__(self, path: Path, entry: Optional[os.DirEntry] = None, follow_symlinks: bool = True):
+        self.path = path
+        self._entry = entry
+        self._stat = None
+        self._follow = follow_symlinks
+
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            with metrics.span("stat"):
+                if self._entry is not None:
+                    self._stat = self._entry.stat(follow_symlinks=self._follow)
+                else:
+                    self._stat = self.path.stat()
+        return self._stat
+
+    def __lt__(self, other: "ScannedFile") -> bool:
+        return self.path < other.path
+
+    def __repr__(self) -> str:
+        return f"ScannedFile({str(self.path)!r})"
+
+class FileScanner:
+    """Walks directory trees with pruning, optionally scanning subtrees in parallel.
+
+    Directories are read breadth-first. With workers > 1 several directories are read
+    at once (this mostly pays off on network filesystems), but results are still
+    yielded in the same order as a single-threaded scan.
+    """
+
+    def __init__(self, ignore_patterns: Optional[Iterable[str]] = None, skip_hidden: bool = True,
+                 max_depth: Optional[int] = None, symlinks: str = "files", workers: int = 1):
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"symlinks must be one of {', '.join(SYMLINK_POLICIES)}")
+        patterns = list(ignore_patterns or [])
+        self._ignore = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+        self.skip_hidden = skip_hidden
+        self.max_depth = max_depth
+        self.symlinks = symlinks
+        self.workers = workers
+
+    def scan(self, directory: str, extensions: Optional[Iterable[str]] = None,
+             exclude: Optional[Iterable[str]] = None,
+             on_skip: Optional[Callable[[int], None]] = None) -> Iterator[ScannedFile]:
+        """Yield files under directory, optionally only those with the given extensions.
+
+        `exclude` lists absolute directory paths to prune. Files rejected by the
+        extension filter are not yielded; `on_skip`, if given, is called with how many
+        were rejected in each directory. The count is per call because one scanner
+        serves concurrent scans.
+        """
+        wanted = frozenset(e.lower() for e in extensions) if extensions is not None else None
+        excluded = frozenset(os.path.abspath(p) for p in exclude or [])
+        root = os.path.abspath(directory)
+        visited = set()
+
+        def read(job: Tuple[str, int]):
+            with metrics.span("walk"):
+                return self._read_directory(job[0], job[1], root, wanted, excluded, visited)
+
+        if self.workers <= 1:
+            queue = deque([(root, 0)])
+            while queue:
+                files, subdirs, skipped = read(queue.popleft())
+                if skipped and on_skip:
+                    on_skip(skipped)
+                queue.extend(subdirs)
+                yield from files
+            return
+
+        # Futures are consumed in submission order, so output order does not depend on timing
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = deque([executor.submit(read, (root, 0))])
+            while futures:
+                files, subdirs, skipped = futures.popleft().result()
+                if skipped and on_skip:
+                    on_skip(skipped)
+                futures.extend(executor.submit(read, job) for job in subdirs)
+                yield from files
+
+    def _read_directory(self, path: str, depth: int, root: str, wanted, excluded, visited):
+        """Read one directory, returning (files, subdirectory jobs, skipped count)."""
+        files: List[ScannedFile] = []
+        subdirs: List[Tuple[str, int]] = []
+        skipped = 0
+        follow = self.symlinks == "follow"
+        try:
+            with os.scandir(path) as iterator:
+                entries = sorted(iterator, key=lambda e: e.name)
+        except OSError:
+            return files, subdirs, skipped
+
+        for entry in entries:
+            name = entry.name
+            if self.skip_hidden and name.startswith("."):
+                continue
+            if self._ignore and (self._ignore.match(name)
+                                 or self._ignore.match(entry.path[len(root) + 1:])):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=follow):
+                    if entry.path in excluded:
+                        continue
+                    if self.max_depth is not None and depth >= self.max_depth:
+                        continue
+                    if follow:
+                        # Guard against symlink loops by remembering real directories
+                        key = os.path.realpath(entry.path)
+                        if key in visited:
+                            continue
+                        visited.add(key)
+                    subdirs.append((entry.path, depth + 1))
+                elif entry.is_file(follow_symlinks=self.symlinks != "skip"):
+                    if wanted is not None and os.path.splitext(name)[1].lower() not in wanted:
+                        skipped += 1
+                        continue
+                    files.append(ScannedFile(Path(entry.path), entry, self.symlinks != "skip"))
+            except OSError:
+                continue
+        return files, subdirs, skipped
@@ -0,0 +1,268 @@
+"""
+Embedding-based vector index for semantic search.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+class VectorIndex:
+    """Persistent matrix of normalized chunk embeddings with a sidecar path/offset table.
+
+    The matrix lives in a raw float32 file that is memory-mapped on load, so opening
+    an index is cheap regardless of its size. The sidecar JSON holds one (path, offset)
+    row per matrix row plus the mtime/size each file was embedded at. Rows added since
+    the last save are kept as separate blocks after the mapped matrix and are only
+    merged with it when the index is saved.
+    """
+
+    MATRIX_FILE = "vectors.f32"
+    TABLE_FILE = "vectors.json"
+
+    def __init__(self, index_dir: str, model: str, chunk_size: int = 1000, max_chunks: int = 8):
+        self.index_dir = Path(index_dir).expanduser()
+        self.model = model
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.dim = 0
+        self._rows: List[Tuple[str, int]] = []
+        self._files: Dict[str, Dict[str, int]] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._blocks: List[np.ndarray] = []
+        # One byte per row, so appending and removing rows stay cheap
+        self._alive = bytearray()
+        # Each file's rows are contiguous: path -> (first row, end row)
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        # Row numbers of the files under each searched prefix, until the rows change
+        self._prefix_rows: Dict[str, np.ndarray] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def _load(self):
+        """Load the table and memory-map the matrix if an index for this model exists."""
+        table_path = self.index_dir / self.TABLE_FILE
+        matrix_path = self.index_dir / self.MATRIX_FILE
+        if not table_path.exists() or not matrix_path.exists():
+            return
+        with open(table_path, 'r') as f:
+            table = json.load(f)
+        if table.get("model") != self.model:
+            return
+
+        self.dim = table["dim"]
+        self._rows = [tuple(row) for row in table["rows"]]
+        self._files = table["files"]
+        self._map_matrix()
+        self._alive = bytearray(b"\x01" * len(self._rows))
+        self._ranges = self._row_ranges(self._rows)
+
+    def _map_matrix(self):
+        """Memory-map the saved matrix for the current rows."""
+        if self._rows:
+            self._matrix = np.memmap(self.index_dir / self.MATRIX_FILE, dtype=np.float32, mode='r',
+                                     shape=(len(self._rows), self.dim))
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._blocks = []
+
+    @staticmethod
+    def _row_ranges(rows: List[Tuple[str, int]]) -> Dict[str, Tuple[int, int]]:
+        """Find each file's run of rows in one pass."""
+        ranges: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][0] != rows[start][0]:
+                ranges[rows[start][0]] = (start, i)
+                start = i
+        return ranges
+
+    def _appended(self) -> Optional[np.ndarray]:
+        """Rows added since the last save, merged into one block (copying only those rows)."""
+        if len(self._blocks) > 1:
+            self._blocks = [np.vstack(self._blocks)]
+        return self._blocks[0] if self._blocks else None
+
+    def _alive_mask(self) -> np.ndarray:
+        return np.frombuffer(bytes(self._alive), dtype=bool)
+
+    def save(self):
+        """Compact removed rows and write the matrix and table to disk."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        keep = np.flatnonzero(self._alive_mask())
+        saved = len(self._matrix)
+        appended = self._appended()
+        rows = [self._rows[i] for i in keep]
+
+        # Write to temporaries first so a crash never leaves a half-written index
+        matrix_tmp = self.index_dir / (self.MATRIX_FILE + ".tmp")
+        table_tmp = self.index_dir / (self.TABLE_FILE + ".tmp")
+        with open(matrix_tmp, 'wb') as f:
+            np.ascontiguousarray(self._matrix[keep[keep < saved]], dtype=np.float32).tofile(f)
+            if appended is not None:
+                np.ascontiguousarray(appended[keep[keep >= saved] - saved], dtype=np.float32).tofile(f)
+        with open(table_tmp, 'w') as f:
+            json.dump({"model": self.model, "dim": self.dim, "rows": rows, "files": self._files}, f)
+
+        # Drop the old mapping before replacing the file it points at
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        os.replace(matrix_tmp, self.index_dir / self.MATRIX_FILE)
+        os.replace(table_tmp, self.index_dir / self.TABLE_FILE)
+        self._rows = rows
+        self._map_matrix()
+        self._alive = bytearray(b"\x01" * len(rows))
+        self._ranges = self._row_ranges(rows)
+        self._prefix_rows = {}
+
+    def is_current(self, path: str, stat_result) -> bool:
+        """Check whether a file is indexed at its current mtime and size."""
+        entry = self._files.get(path)
+        return bool(entry) and entry["mtime_ns"] == stat_result.st_mtime_ns and entry["size"] == stat_result.st_size
+
+    def chunk(self, text: str) -> List[Tuple[int, str]]:
+        """Split text into (offset, chunk) windows, capped at max_chunks."""
+        chunks = []
+        for offset in range(0, len(text), self.chunk_size):
+            piece = text[offset:offset + self.chunk_size]
+            if piece.strip():
+                chunks.append((offset, piece))
+            if len(chunks) >= self.max_chunks:
+                break
+        return chunks
+
+    def add_file(self, path: str, stat_result, offsets: List[int], vectors: List[List[float]]):
+        """Replace the rows of a file with freshly computed chunk embeddings."""
+        self.remove_file(path)
+        self._files[path] = {"mtime_ns": stat_result.st_mtime_ns, "size": stat_result.st_size}
+        if not vectors:
+            return
+
+        block = np.asarray(vectors, dtype=np.float32)
+        if not self.dim:
+            self.dim = block.shape[1]
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+
+        start = len(self._rows)
+        self._blocks.append(block)
+        self._alive.extend(b"\x01" * len(block))
+        self._rows.extend((path, offset) for offset in offsets)
+        self._ranges[path] = (start, len(self._rows))
+        self._prefix_rows = {}
+
+    def remove_file(self, path: str):
+        """Mark all rows of a file as removed."""
+        if self._files.pop(path, None) is None:
+            return
+        start, end = self._ranges.pop(path, (0, 0))
+        self._alive[start:end] = bytes(end - start)
+        self._prefix_rows = {}
+
+    def _vectors(self, start: int, end: int) -> np.ndarray:
+        """Rows start:end, which lie either in the saved matrix or in the appended block."""
+        saved = len(self._matrix)
+        if end <= saved:
+            return np.asarray(self._matrix[start:end])
+        return self._appended()[start - saved:end - saved]
+
+    def _rows_of(self, paths: Iterable[str]) -> np.ndarray:
+        """Row numbers of the given indexed files, expanded from their ranges without a per-row loop."""
+        ranges = np.array([self._ranges[path] for path in paths], dtype=np.int64).reshape(-1, 2)
+        lengths = ranges[:, 1] - ranges[:, 0]
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        return np.repeat(ranges[:, 0] - offsets, lengths) + np.arange(lengths.sum())
+
+    def _selected_rows(self, prefix: Optional[str], allowed: Optional[Set[str]]) -> Optional[np.ndarray]:
+        """Rows of live files passing prefix and allowed, or None for every row.
+
+        Rows come back in ascending order. Only live files have ranges, so removed rows
+        never need masking here, and ranges are kept in row order.
+        """
+        if allowed is not None:
+            return np.sort(self._rows_of(path for path in allowed
+                                         if path in self._ranges and (not prefix or path.startswith(prefix))))
+        if not prefix:
+            return None
+        rows = self._prefix_rows.get(prefix)
+        if rows is None:
+            rows = self._prefix_rows[prefix] = self._rows_of(path for path in self._ranges if path.startswith(prefix))
+        return rows
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Cosine scores of rows (all rows when None) against a normalized query."""
+        saved = len(self._matrix)
+        appended = self._appended()
+        if rows is None or len(rows) * 4 > len(self._rows):
+            # Copying out most of the rows costs more than scoring all of them
+            parts = [np.asarray(self._matrix @ query)]
+            if appended is not None:
+                parts.append(appended @ query)
+            scores = np.concatenate(parts)
+            return np.where(self._alive_mask(), scores, -np.inf) if rows is None else scores[rows]
+        split = np.searchsorted(rows, saved)
+        # Only the selected rows are read from the memory map
+        parts = [np.asarray(self._matrix[rows[:split]]) @ query]
+        if appended is not None:
+            parts.append(appended[rows[split:] - saved] @ query)
+        return np.concatenate(parts)
+
+    def search(self, query_vector: List[float], k: int, prefix: Optional[str] = None,
+               allowed: Optional[Set[str]] = None) -> List[Dict]:
+        """Return the k best files by cosine similarity of their best-matching chunk.
+
+        `allowed`, when given, restricts the ranking to those paths. Only the rows of
+        files passing the restrictions are scored.
+        """
+        if not self._rows or not k:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        rows = self._selected_rows(prefix, allowed)
+        if rows is not None and not len(rows):
+            return []
+        scores = self._scores(query, rows)
+
+        # Several chunks of one file may rank highly, so over-fetch and keep the best per file
+        fetch = min(len(scores), k * self.max_chunks)
+        top = np.argpartition(-scores, fetch - 1)[:fetch]
+        top = top[np.argsort(-scores[top])]
+
+        results, seen = [], set()
+        for i in top:
+            if not np.isfinite(scores[i]):
+                break
+            path, offset = self._rows[rows[i] if rows is not None else i]
+            if path in seen:
+                continue
+            seen.add(path)
+            results.append({"path": path, "offset": offset, "score": float(scores[i])})
+            if len(results) >= k:
+                break
+        return results
+
+    def embed_text(self, text: str, embed: Callable[[str], Optional[List[float]]]) -> Tuple[List[int], List[List[float]]]:
+        """Chunk and embed a document without touching the index, so it is safe on worker threads."""
+        offsets, vectors = [], []
+        for offset, piece in self.chunk(text):
+            vector = embed(piece)
+            if vector:
+                offsets.append(offset)
+                vectors.append(vector)
+        return offsets, vectors
+
+    def document_vectors(self, paths: List[str]) -> Dict[str, np.ndarray]:
+        """Return the normalized mean chunk embedding of each indexed file in paths."""
+        vectors = {}
+        for path in set(paths) & self._ranges.keys():
+            mean = self._vectors(*self._ranges[path]).mean(axis=0)
+            vectors[path] = mean / max(float(np.linalg.norm(mean)), 1e-12)
+        return vectors
+
+    def paths_under(self, prefix: str) -> List[str]:
+        """List indexed file paths below a directory prefix."""
+        return [path for path in self._files if path.startswith(prefix)]
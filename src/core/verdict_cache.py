@@ -0,0 +1,143 @@
+"""
+Persistent cache of LLM relevance verdicts.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from ..utils.metrics import metrics
+
+class VerdictCache:
+    """SQLite-backed cache of YES/NO verdicts keyed by content hash, query and model."""
+
+    COMMIT_EVERY = 100
+
+    def __init__(self, db_path: str, max_entries: int = 100000):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS verdicts (
+                content_hash TEXT NOT NULL,
+                query TEXT NOT NULL,
+                model TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                chunk_offset INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (content_hash, query, model)
+            );
+            CREATE INDEX IF NOT EXISTS idx_verdicts_last_used ON verdicts(last_used);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(verdicts)")}
+        if "chunk_offset" not in columns:
+            # Databases written before chunked search lack the matching chunk offset
+            self._conn.execute("ALTER TABLE verdicts ADD COLUMN chunk_offset INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query so trivially different spellings share entries."""
+        return " ".join(query.lower().split())
+
+    def fingerprint(self, file_path: Path, stat_result=None) -> str:
+        """Return the content hash of a file, rehashing only when mtime or size changed."""
+        stat_result = stat_result or file_path.stat()
+        key = str(file_path.resolve())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, content_hash FROM files WHERE path = ?", (key,)
+            ).fetchone()
+        if row and row[0] == stat_result.st_mtime_ns and row[1] == stat_result.st_size:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with metrics.span("fingerprint"), open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)",
+                (key, stat_result.st_mtime_ns, stat_result.st_size, content_hash)
+            )
+            self._mark_dirty()
+        return content_hash
+
+    def get(self, content_hash: str, query: str, model: str) -> Optional[Tuple[str, int]]:
+        """Look up a cached (verdict, chunk offset) pair, refreshing its LRU timestamp on a hit."""
+        args = (content_hash, self.normalize_query(query), model)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT verdict, chunk_offset FROM verdicts "
+                "WHERE content_hash = ? AND query = ? AND model = ?", args
+            ).fetchone()
+            if row is None:
+                metrics.count("verdict_cache_misses")
+                return None
+            metrics.count("verdict_cache_hits")
+            self._conn.execute(
+                "UPDATE verdicts SET last_used = ? WHERE content_hash = ? AND query = ? AND model = ?",
+                (time.time(),) + args
+            )
+            self._mark_dirty()
+        return row[0], row[1]
+
+    def put(self, content_hash: str, query: str, model: str, verdict: str, chunk_offset: int = 0):
+        """Store a verdict for a content hash, query and model, with the offset of the deciding chunk."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (content_hash, query, model, verdict, last_used, chunk_offset) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, self.normalize_query(query), model, verdict, time.time(), chunk_offset)
+            )
+            self._mark_dirty()
+
+    def forget(self, file_path: Path):
+        """Drop the stored fingerprint of a file."""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (str(file_path.resolve()),))
+            self._mark_dirty()
+
+    def flush(self):
+        """Evict past the size cap and commit pending writes."""
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the database."""
+        self.flush()
+        self._conn.close()
+
+    def _mark_dirty(self):
+        """Count a pending write and commit periodically. Caller holds the lock."""
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def _evict(self):
+        """Remove least recently used verdicts beyond max_entries. Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE rowid IN "
+                "(SELECT rowid FROM verdicts ORDER BY last_used LIMIT ?)", (excess,)
+            )
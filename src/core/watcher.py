@@ -0,0 +1,181 @@
+"""
+Filesystem watcher that keeps the document catalog and search indexes current.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .scanner import ScannedFile
+from ..utils.concurrency import bounded_map
+
+class _EventCollector(FileSystemEventHandler):
+    """Forwards watchdog events to the owning IndexWatcher."""
+
+    def __init__(self, watcher: "IndexWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        self.watcher.record(event.src_path, "update", event.is_directory)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.record(event.src_path, "update", False)
+
+    def on_closed(self, event):
+        self.watcher.record(event.src_path, "update", False)
+
+    def on_deleted(self, event):
+        self.watcher.record(event.src_path, "delete", event.is_directory)
+
+    def on_moved(self, event):
+        self.watcher.record(event.src_path, "delete", event.is_directory)
+        self.watcher.record(event.dest_path, "update", event.is_directory)
+
+class IndexWatcher:
+    """Watches a directory tree and applies debounced, batched updates to derived state.
+
+    Events are coalesced per path (the last action wins) and flushed once the tree has
+    been quiet for `debounce` seconds, or after `max_delay` seconds of continuous churn.
+    While running, the watcher also serves as a warm catalog of documents so searches
+    under the watched tree skip the directory walk.
+    """
+
+    def __init__(self, content_analyzer, directory: str, debounce: float = 1.0, max_delay: float = 10.0):
+        self.content_analyzer = content_analyzer
+        self.directory = str(Path(directory).resolve())
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.documents = set()
+        self._pending: Dict[str, str] = {}
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._ready = False
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._observer = Observer()
+        self._flusher = threading.Thread(target=self._flush_loop, name="lfea-index-flush", daemon=True)
+
+    def start(self):
+        """Subscribe to events, reconcile stored state with the disk and start flushing."""
+        print(f"👀 Watching directory: {self.directory}")
+        # Subscribe before reconciling so changes made during the pass are not lost
+        self._observer.schedule(_EventCollector(self), self.directory, recursive=True)
+        self._observer.start()
+        self.reconcile()
+        with self._lock:
+            self._ready = True
+            self._wakeup.notify()
+        self._flusher.start()
+
+    def stop(self):
+        """Stop watching and flush anything still pending."""
+        self._observer.stop()
+        self._observer.join()
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._flusher.is_alive():
+            self._flusher.join()
+        self._flush_now()
+
+    def reconcile(self) -> Dict:
+        """Diff the stored indexes against the disk and rebuild the document catalog."""
+        summary = self.content_analyzer.build_index(self.directory)
+        with self._lock:
+            self.documents = set(summary.get("documents", []))
+        return summary
+
+    def covers(self, directory: str) -> bool:
+        """Check whether directory lies inside the watched tree and the catalog is warm."""
+        if not self._ready:
+            return False
+        target = str(Path(directory).resolve())
+        return target == self.directory or target.startswith(os.path.join(self.directory, ""))
+
+    def documents_under(self, directory: str) -> List[Path]:
+        """Return catalogued documents below directory in a stable order."""
+        prefix = os.path.join(str(Path(directory).resolve()), "")
+        with self._lock:
+            return [Path(path) for path in sorted(self.documents) if path.startswith(prefix)]
+
+    def record(self, path: str, action: str, is_directory: bool):
+        """Queue an action for a path, expanding directory events to the files they affect."""
+        if is_directory:
+            if action == "delete":
+                prefix = os.path.join(path, "")
+                with self._lock:
+                    affected = [p for p in self.documents if p.startswith(prefix)]
+                for file_path in affected:
+                    self.record(file_path, "delete", False)
+            elif os.path.isdir(path):
+                analyzer = self.content_analyzer
+                for entry in analyzer.scanner.scan(path, analyzer.document_extensions):
+                    self.record(str(entry.path), "update", False)
+            return
+
+        if Path(path).suffix.lower() not in self.content_analyzer.document_extensions:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                self._first_event = now
+            self._pending[path] = action
+            self._last_event = now
+            self._wakeup.notify()
+
+    def _flush_loop(self):
+        """Wait for a quiet period (or the max delay) and then apply the pending batch."""
+        while True:
+            with self._lock:
+                while not self._stopped:
+                    if self._ready and self._pending:
+                        now = time.monotonic()
+                        quiet_for = now - self._last_event
+                        waited_for = now - self._first_event
+                        if quiet_for >= self.debounce or waited_for >= self.max_delay:
+                            break
+                        self._wakeup.wait(min(self.debounce - quiet_for, self.max_delay - waited_for))
+                    else:
+                        self._wakeup.wait()
+                if self._stopped:
+                    return
+            self._flush_now()
+
+    def _flush_now(self):
+        """Apply every pending action as one batch."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        analyzer = self.content_analyzer
+        updates = [ScannedFile(Path(path)) for path, action in batch.items()
+                   if action == "update" and os.path.isfile(path)]
+        deletes = [path for path, action in batch.items() if action == "delete" or not os.path.isfile(path)]
+
+        for path in deletes:
+            analyzer.remove_from_indexes(path)
+            if analyzer.verdict_cache:
+                analyzer.verdict_cache.forget(Path(path))
+
+        # Reading and embedding fan out over the workers; index writes stay on this thread
+        indexed = []
+        for outcome in bounded_map(analyzer._prepare_index_update, updates, analyzer.workers):
+            if outcome.get("error"):
+                print(f"  ⚠️  {outcome['error']}")
+            elif not outcome.get("unchanged"):
+                analyzer._apply_index_update(outcome)
+            indexed.append(outcome["path"])
+
+        analyzer.save_indexes()
+        with self._lock:
+            self.documents.difference_update(deletes)
+            self.documents.update(indexed)
+        print(f"🔄 Applied {len(updates)} updates and {len(deletes)} removals.")
@@ -0,0 +1,158 @@
+"""
+Pool of Ollama backends with least-outstanding-requests routing and circuit breakers.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..utils.metrics import metrics
+
+class Breaker:
+    """Circuit breaker state of one model on one backend."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.last_error: Optional[str] = None
+        # Whether the last failure was the server being unreachable rather than the model failing
+        self.unreachable = False
+
+class Backend:
+    """One Ollama server, its requests in flight and a circuit breaker per model."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.breakers: Dict[str, Breaker] = {}
+
+    def breaker(self, model: str) -> Breaker:
+        """The breaker for requests to model, created closed on first use."""
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = Breaker()
+        return breaker
+
+class BackendPool:
+    """Routes each request to the available backend with the fewest requests in flight.
+
+    Every backend has a circuit breaker per model, so a missing or failing embedding
+    model does not stop text generation on the same server. A breaker opens after
+    `failure_threshold` failures in a row, and that model gets no traffic on the
+    backend for `cooldown` seconds. After that one trial request is let through
+    (half-open): success closes the breaker, failure opens it again. A passing health
+    check only proves the server is up, so it closes just the breakers that failed
+    because the server could not be reached; a model that keeps failing stays paused.
+    """
+
+    def __init__(self, urls: Sequence[str], models: Iterable[str] = (), failure_threshold: int = 3,
+                 cooldown: float = 30.0):
+        if not urls:
+            raise ValueError("At least one Ollama backend URL is required")
+        self.backends = [Backend(url) for url in urls]
+        # Breakers of known models exist up front, so health checks can open them before the first request
+        for backend in self.backends:
+            for model in models:
+                backend.breaker(model)
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._turn = 0
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def acquire(self, model: str, exclude: Iterable[Backend] = ()) -> Optional[Backend]:
+        """Reserve the least loaded backend available for model, or None if all its breakers are open.
+
+        Backends in exclude, such as ones that already failed this request, are only
+        chosen when no other backend is available. Ties rotate so idle backends share load.
+        """
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            available = [i for i, backend in enumerate(self.backends) if self._admits(backend.breaker(model), now)]
+            preferred = [i for i in available if self.backends[i] not in exclude] or available
+            if not preferred:
+                return None
+            self._turn += 1
+            count = len(self.backends)
+            index = min(preferred, key=lambda i: (self.backends[i].outstanding, (i - self._turn) % count))
+            backend = self.backends[index]
+            breaker = backend.breaker(model)
+            if breaker.state == Breaker.HALF_OPEN:
+                breaker.trial_in_flight = True
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend: Backend, model: str, ok: Optional[bool], error: Optional[str] = None,
+                unreachable: bool = False):
+        """Return a reserved backend. ok=None means the outcome says nothing about its health.
+
+        `unreachable` marks a failure to connect at all, as opposed to an error from the model.
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            breaker = backend.breaker(model)
+            breaker.trial_in_flight = False
+            if ok:
+                self._close(breaker)
+            elif ok is not None:
+                breaker.failures += 1
+                breaker.last_error = error
+                breaker.unreachable = unreachable
+                metrics.count("llm_backend_failures")
+                if breaker.state == Breaker.HALF_OPEN or breaker.failures >= self.failure_threshold:
+                    self._open(breaker)
+
+    def record_health(self, backend: Backend, healthy: bool, error: Optional[str] = None):
+        """Apply a health check result to the model breakers on backend.
+
+        A failed check opens every breaker; a passing one closes those whose failures
+        were the server being unreachable.
+        """
+        with self._lock:
+            for breaker in backend.breakers.values():
+                if not healthy:
+                    breaker.last_error = error
+                    breaker.unreachable = True
+                    self._open(breaker)
+                elif breaker.unreachable:
+                    self._close(breaker)
+
+    def status(self) -> List[Dict]:
+        """Describe every backend and its breakers, for reports and health endpoints."""
+        with self._lock:
+            return [{"url": backend.url, "outstanding": backend.outstanding,
+                     "models": {model: {"state": breaker.state, "failures": breaker.failures,
+                                        "last_error": breaker.last_error}
+                                for model, breaker in backend.breakers.items()}}
+                    for backend in self.backends]
+
+    def _admits(self, breaker: Breaker, now: float) -> bool:
+        """Whether a breaker lets a request through, moving an expired open one to half-open. Caller holds the lock."""
+        if breaker.state == Breaker.OPEN and now - breaker.opened_at >= self.cooldown:
+            breaker.state = Breaker.HALF_OPEN
+        if breaker.state == Breaker.HALF_OPEN:
+            return not breaker.trial_in_flight
+        return breaker.state == Breaker.CLOSED
+
+    def _open(self, breaker: Breaker):
+        """Trip the breaker. Caller holds the lock."""
+        if breaker.state != Breaker.OPEN:
+            metrics.count("llm_breaker_trips")
+        breaker.state = Breaker.OPEN
+        breaker.opened_at = time.monotonic()
+
+    @staticmethod
+    def _close(breaker: Breaker):
+        """Reset the breaker. Caller holds the lock."""
+        breaker.failures = 0
+        breaker.state = Breaker.CLOSED
+        breaker.unreachable = False
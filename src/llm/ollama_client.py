@@ -1,40 +1,287 @@
+import json
+import random
+import threading
+import time
+
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from .backend_pool import Backend, BackendPool
+from ..utils.concurrency import bounded_map
+from ..utils.metrics import metrics
+
+T = TypeVar("T")
+
+class OllamaError(Exception):
+    """An Ollama request failed in a way that retrying elsewhere would not fix, e.g. a missing model."""
+
+class OllamaUnavailableError(OllamaError):
+    """No backend answered a request, after retrying on the others."""
+
+class _BackendFailure(Exception):
+    """A backend answered with an error status; the request may succeed on another one."""
 
 class OllamaClient:
-    """Client for communicating with Ollama API."""
+    """Client for communicating with Ollama API.
     
-    def __init__(self, url: str = "http://localhost:11434", model: str = "gemma3n:e2b"):
-        self.url = url
+    Requests go to a pool of one or more Ollama servers: each one is sent to the
+    backend with the fewest requests in flight, and a failed request is retried with
+    backoff on another backend. Failures raise OllamaError.
+    """
+
+    # Enough for a one-word answer plus a leading quote or markup token
+    CHOICE_TOKENS = 3
+
+    def __init__(self, url: str = "http://localhost:11434", model: str = "gemma3n:e2b",
+                 max_connections: int = 4, timeout: float = 120,
+                 embedding_model: str = "nomic-embed-text", keep_alive: Optional[str] = None,
+                 backends: Optional[Sequence[str]] = None, max_retries: int = 2,
+                 retry_backoff: float = 0.5, breaker_failures: int = 3, breaker_cooldown: float = 30.0):
+        self.pool = BackendPool(backends or [url], models=(model, embedding_model),
+                                failure_threshold=breaker_failures, cooldown=breaker_cooldown)
+        self.url = self.pool.backends[0].url
         self.model = model
+        self.embedding_model = embedding_model
+        self.keep_alive = keep_alive
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        # Reuse TCP connections across calls; each backend gets a pool sized for concurrent workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.pool), pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def query(self, prompt: str, context_length: int = 1024, num_tokens: int = 150,
+              timeout: Optional[float] = None, format: Optional[str] = None) -> str:
+        """Send a query to Ollama API. Pass format="json" to constrain the reply to JSON.
+        
+        Raises OllamaError if no backend could answer.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "num_ctx": context_length,
+                "num_predict": num_tokens,
+            }
+        }
+        if format:
+            payload["format"] = format
+        payload = self._with_keep_alive(payload)
+
+        def send(base_url: str) -> str:
+            with metrics.span("llm.generate"):
+                response = self.session.post(f"{base_url}/api/generate", json=payload,
+                                             timeout=timeout or self.timeout)
+            self._check_status(response)
+            data = response.json()
+            self._record_stats(data)
+            return data['response'].strip()
+
+        return self._call(send, self.model)
+
+    def query_choice(self, prompt: str, choices: Sequence[str], context_length: int = 1024,
+                     timeout: Optional[float] = None) -> str:
+        """Stream a reply that the server cuts off after one short word, and match it against choices.
+        
+        Returns the matched choice (upper-cased) or the whole reply if it matched none,
+        and raises OllamaError if no backend could answer. A newline or period stop
+        sequence and a tiny `num_predict` make Ollama end the generation right after the
+        deciding word; the few chunks left are still read so the connection goes back
+        to the pool. A reply cut off empty by a leading newline is asked again once
+        without the stop sequence.
+        """
+        wanted = [choice.upper() for choice in choices]
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "num_ctx": context_length,
+                "num_predict": self.CHOICE_TOKENS,
+                "stop": ["\n", "."],
+            }
+        }
+        payload = self._with_keep_alive(payload)
+
+        def match(text: str) -> Optional[str]:
+            answer = text.lstrip(" \t\r\n\"'*").upper()
+            return next((choice for choice in wanted if answer.startswith(choice)), None)
+
+        def send(base_url: str) -> str:
+            text, matched = "", None
+            with metrics.span("llm.generate"):
+                with self.session.post(f"{base_url}/api/generate", json=payload,
+                                       timeout=timeout or self.timeout, stream=True) as response:
+                    self._check_status(response)
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        if matched is None:
+                            text += data.get("response", "")
+                            matched = match(text)
+                        if data.get("done"):
+                            self._record_stats(data)
+            return matched if matched is not None else text.strip()
+
+        reply = self._call(send, self.model)
+        if reply:
+            return reply
+        metrics.count("llm_choice_retries")
+        reply = self.query(prompt, context_length, self.CHOICE_TOKENS + 2, timeout)
+        return match(reply) or reply
+
+    def warmup(self, background: bool = True) -> Optional[threading.Thread]:
+        """Health-check every backend, then ask the healthy ones to load the model before real work.
+        
+        The model stays loaded for keep_alive. Prints a warning if no backend answers.
+        """
+        payload = self._with_keep_alive({"model": self.model})
+
+        def load_one(base_url: str):
+            try:
+                with metrics.span("llm.warmup"):
+                    self.session.post(f"{base_url}/api/generate", json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                pass
+
+        def load():
+            healthy = self.check_backends()
+            if not healthy:
+                print(f"⚠️  No Ollama backend answered ({', '.join(b.url for b in self.pool.backends)}). "
+                      f"Model requests will fail until one is reachable.")
+            for _ in bounded_map(load_one, [backend.url for backend in healthy], len(self.pool)):
+                pass
+
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="lfea-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _record_stats(data: dict):
+        """Record the token counts and server-side timings Ollama reports with each reply."""
+        if not metrics.enabled:
+            return
+        metrics.count("llm_requests")
+        metrics.count("llm_prompt_tokens", data.get("prompt_eval_count", 0))
+        metrics.count("llm_eval_tokens", data.get("eval_count", 0))
+        # Ollama reports durations in nanoseconds
+        for field, stage in (("load_duration", "llm.load"),
+                             ("prompt_eval_duration", "llm.prompt_eval"),
+                             ("eval_duration", "llm.eval")):
+            if data.get(field):
+                metrics.observe(stage, data[field] / 1e9)
     
-    def query(self, prompt: str, context_length: int = 1024, num_tokens: int = 150) -> str:
-        """Send a query to Ollama API."""
+    def embed(self, text: str, timeout: Optional[float] = None) -> Optional[List[float]]:
+        """Get an embedding vector for text, or None if no backend could provide one."""
+        payload = self._with_keep_alive({"model": self.embedding_model, "prompt": text})
+
+        def send(base_url: str) -> Optional[List[float]]:
+            with metrics.span("llm.embed"):
+                response = self.session.post(f"{base_url}/api/embeddings", json=payload,
+                                             timeout=timeout or self.timeout)
+            self._check_status(response)
+            return response.json().get('embedding') or None
+
         try:
-            response = requests.post(
-                f"{self.url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "num_ctx": context_length,
-                        "num_predict": num_tokens,
-                    }
-                },
-                timeout=120
-            )
-            if response.status_code == 200:
-                return response.json()['response'].strip()
-            else:
-                return f"Error: {response.status_code}"
-        except Exception as e:
-            return f"Error connecting to Ollama: {str(e)}"
+            return self._call(send, self.embedding_model)
+        except OllamaError:
+            return None
+
+    def _call(self, send: Callable[[str], T], model: str) -> T:
+        """Run send(base_url) on the least loaded backend, retrying failures on other backends.
+        
+        Each retry waits an exponentially growing, jittered backoff first. Connection
+        errors, timeouts, server errors and malformed replies count against the
+        backend's circuit breaker for model. Client errors (HTTP 4xx, such as a model
+        that is not pulled) are raised at once and leave the breaker alone.
+        """
+        tried, last_error = [], None
+        for attempt in range(self.max_retries + 1):
+            backend = self.pool.acquire(model, exclude=tried)
+            if backend is None:
+                break
+            if attempt:
+                metrics.count("llm_retries")
+            try:
+                result = send(backend.url)
+            except OllamaError:
+                self.pool.release(backend, model, None)
+                raise
+            except (requests.RequestException, _BackendFailure, ValueError, KeyError) as e:
+                last_error = f"{backend.url}: {e}"
+                self.pool.release(backend, model, False, last_error,
+                                  unreachable=isinstance(e, requests.ConnectionError))
+                tried.append(backend)
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+                continue
+            self.pool.release(backend, model, True)
+            return result
+        metrics.count("llm_failures")
+        if last_error is None:
+            raise OllamaUnavailableError(f"All {len(self.pool)} Ollama backends are paused for {model} "
+                                         f"after repeated failures")
+        raise OllamaUnavailableError(f"Ollama request failed after {len(tried)} attempts (last: {last_error})")
+
+    @staticmethod
+    def _check_status(response: requests.Response):
+        """Raise for an error status: OllamaError for a client error, _BackendFailure otherwise.
+        
+        Timeouts (408) and overload (429) are the backend's problem, so they are retried
+        elsewhere like server errors.
+        """
+        if response.status_code == 200:
+            return
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            raise OllamaError(f"Ollama rejected the request (HTTP {response.status_code}): {response.text[:200]}")
+        raise _BackendFailure(f"HTTP {response.status_code}")
+    
+    def _with_keep_alive(self, payload: dict) -> dict:
+        """Add the configured keep_alive so Ollama keeps the model loaded between requests."""
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
     
     def is_available(self) -> bool:
-        """Check if Ollama API is available."""
-        try:
-            response = requests.get(f"{self.url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        """Health-check every backend, updating their circuit breakers. True if any is up."""
+        return bool(self.check_backends())
+
+    def start_health_checks(self, interval: float) -> threading.Event:
+        """Health-check every backend every interval seconds on a daemon thread.
+        
+        Long-running modes use this so a backend that went down is paused before
+        requests pile up on it, and one that came back is used again without waiting
+        for a trial request. Set the returned event to stop.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.check_backends()
+
+        threading.Thread(target=run, name="lfea-health", daemon=True).start()
+        return stop
+
+    def check_backends(self) -> List[Backend]:
+        """Health-check every backend, updating their circuit breakers, and return the healthy ones."""
+        def check(backend) -> bool:
+            try:
+                response = self.session.get(f"{backend.url}/api/tags", timeout=5)
+                healthy, error = response.status_code == 200, f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                healthy, error = False, str(e)
+            self.pool.record_health(backend, healthy, None if healthy else error)
+            return healthy
+
+        results = list(bounded_map(check, self.pool.backends, len(self.pool)))
+        return [backend for backend, healthy in zip(self.pool.backends, results) if healthy]
@@ -0,0 +1,129 @@
+"""
+Thin client for a running agent service, plus the state file both sides share.
+
+This module only imports the standard library so one-shot CLI calls stay fast.
+"""
+
+import http.client
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+STATE_FILE = "daemon.json"
+
+class DaemonError(Exception):
+    """Raised when the agent service rejects or fails a request."""
+
+def state_path(cache_dir: str) -> Path:
+    """Location of the file announcing a running service for this cache directory."""
+    return Path(cache_dir).expanduser() / STATE_FILE
+
+def write_state(path: Path, state: Dict[str, Any]):
+    """Write the state file readable by the owner only, since it holds the access token."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def remove_state(path: Path, token: str):
+    """Remove the state file unless another service has replaced it since."""
+    try:
+        with open(path) as f:
+            if json.load(f).get("token") == token:
+                os.remove(path)
+    except (OSError, ValueError):
+        pass
+
+class DaemonClient:
+    """Sends requests to an agent service over loopback HTTP."""
+
+    def __init__(self, host: str, port: int, token: str):
+        self.host = host
+        self.port = port
+        self.token = token
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @classmethod
+    def discover(cls, config_path: Optional[str] = None) -> Optional["DaemonClient"]:
+        """Return a client for the service started with this config, or None if none answers."""
+        from ..config.settings import Config
+
+        config = Config(config_path)
+        try:
+            with open(state_path(config.cache_dir)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("config_path") != str(Path(config.config_path).resolve()):
+            return None
+
+        client = cls(state["host"], state["port"], state["token"])
+        try:
+            client._request("GET", "/health", timeout=0.5)
+        except (OSError, DaemonError):
+            return None
+        return client
+
+    def search(self, directory: str, query: str, limit: Optional[int] = None,
+               filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield matches as the service confirms them. Closing the iterator cancels the search."""
+        connection = self._connect(None)
+        try:
+            response = self._send(connection, "POST", "/search",
+                                  {"directory": directory, "query": query, "limit": limit, "filters": filters})
+            for line in response:
+                item = json.loads(line)
+                if "error" in item:
+                    raise DaemonError(item["error"])
+                if item.get("done"):
+                    return
+                yield item
+            raise DaemonError("the service closed the connection before the search finished")
+        finally:
+            connection.close()
+
+    def organize(self, directory: str, dry_run: bool = False) -> Dict[str, Any]:
+        return self._request("POST", "/organize", {"directory": directory, "dry_run": dry_run})
+
+    def undo_organize(self, directory: str) -> Dict[str, Any]:
+        return self._request("POST", "/undo", {"directory": directory})
+
+    def build_index(self, directory: str) -> Dict[str, Any]:
+        return self._request("POST", "/index", {"directory": directory})
+
+    def scan_directory(self, directory: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._request("POST", "/scan", {"directory": directory, "filters": filters})
+
+    def find_duplicates(self, directory: str) -> Dict[str, Any]:
+        return self._request("POST", "/dedup", {"directory": directory})
+
+    def _connect(self, timeout: Optional[float]) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _send(self, connection: http.client.HTTPConnection, method: str, path: str,
+              body: Optional[Dict[str, Any]] = None) -> http.client.HTTPResponse:
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        connection.request(method, path, body=data, headers=headers)
+        response = connection.getresponse()
+        if response.status != 200:
+            try:
+                message = json.loads(response.read()).get("error", response.reason)
+            except ValueError:
+                message = response.reason
+            raise DaemonError(f"{response.status}: {message}")
+        return response
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+        connection = self._connect(timeout)
+        try:
+            return json.loads(self._send(connection, method, path, body).read())
+        finally:
+            connection.close()
@@ -0,0 +1,184 @@
+"""
+Long-running agent service that keeps one warm agent behind a loopback HTTP API.
+"""
+
+import json
+import os
+import secrets
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .client import remove_state, state_path, write_state
+
+class AgentServer:
+    """Serves search, organize, index, scan and dedup requests from a warm LFEAgent.
+
+    Every connection is handled on its own thread, so searches from several clients
+    run concurrently against the same caches and indexes. Requests that move files or
+    rewrite the indexes run one at a time. Clients authenticate with the token in the
+    state file, which only the owner can read.
+    """
+
+    def __init__(self, agent, config_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0):
+        self.agent = agent
+        self.config_path = str(Path(config_path or agent.config.config_path).resolve())
+        self.token = secrets.token_hex(16)
+        self.state_path = state_path(agent.config.cache_dir)
+        self._write_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Announce the service in the state file and handle requests until interrupted."""
+        host, port = self._server.server_address[:2]
+        write_state(self.state_path, {"host": host, "port": port, "token": self.token,
+                                      "pid": os.getpid(), "config_path": self.config_path})
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            remove_state(self.state_path, self.token)
+
+    def shutdown(self):
+        """Stop serve_forever from another thread."""
+        self._server.shutdown()
+
+    def _search(self, handler, request: Dict[str, Any]):
+        """Stream matches as NDJSON, then a final {"done": true} line."""
+        limit = request.get("limit")
+        try:
+            matches = self.agent.iter_search_files_by_content(request["directory"], request.get("query") or "",
+                                                              request.get("filters"))
+        except ValueError as e:
+            handler.reply(400, {"error": str(e)})
+            return
+        handler.start_stream()
+        found = 0
+        try:
+            for match in matches:
+                handler.write_line(match)
+                found += 1
+                if limit and found >= limit:
+                    break
+            handler.write_line({"done": True, "found": found})
+            handler.end_stream()
+        except OSError:
+            # The client hung up (limit reached or Ctrl+C); stop searching for it
+            handler.close_connection = True
+        except Exception as e:
+            handler.write_line({"error": str(e)})
+            handler.end_stream()
+        finally:
+            matches.close()
+
+    def _organize(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            return self.agent.organize_files_by_content(request["directory"],
+                                                        dry_run=bool(request.get("dry_run")))
+
+    def _undo(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            return self.agent.undo_organize(request["directory"])
+
+    def _index(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            summary = self.agent.build_index(request["directory"])
+        # The full document list is only useful in-process
+        return {key: value for key, value in summary.items() if key != "documents"}
+
+    def _scan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self.agent.scan_directory(request["directory"], request.get("filters"))
+
+    def _dedup(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self.agent.find_duplicates(request["directory"])
+
+    def _make_handler(self):
+        server = self
+        routes = {"/organize": self._organize, "/undo": self._undo, "/index": self._index,
+                  "/scan": self._scan, "/dedup": self._dedup}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def start_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def write_line(self, body: Dict[str, Any]):
+                data = json.dumps(body).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def end_stream(self):
+                self.wfile.write(b"0\r\n\r\n")
+
+            def authorized(self) -> bool:
+                expected = f"Bearer {server.token}"
+                if secrets.compare_digest(self.headers.get("Authorization", ""), expected):
+                    return True
+                self.reply(401, {"error": "invalid token"})
+                return False
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                if self.path == "/health":
+                    self.reply(200, {"status": "ok", "pid": os.getpid(),
+                                     "backends": server.agent.llm_client.pool.status()})
+                else:
+                    self.reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    request["directory"] = str(request["directory"])
+                except (KeyError, TypeError, ValueError):
+                    self.reply(400, {"error": "expected a JSON body with a directory"})
+                    return
+
+                if self.path == "/search":
+                    if not request.get("query") and not request.get("filters"):
+                        self.reply(400, {"error": "search requires a query or filters"})
+                        return
+                    server._search(self, request)
+                elif self.path in routes:
+                    try:
+                        result = routes[self.path](request)
+                    except Exception as e:
+                        self.reply(500, {"error": str(e)})
+                        return
+                    self.reply(200, result)
+                else:
+                    self.reply(404, {"error": "not found"})
+
+        return Handler
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
@@ -1,10 +1,11 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 
 class CLI:
     """Command-line interface for the Local File Explorer Agent."""
     
-    def __init__(self, agent):
+    def __init__(self, agent, search_limit: Optional[int] = None):
         self.agent = agent
+        self.search_limit = search_limit
     
     def run_interactive(self):
         """Run interactive chat mode."""
@@ -48,8 +49,8 @@ class CLI:
         directory = input("📁 Enter directory to search (default: ./tests): ").strip() or "./tests"
         print(f"🔍 Searching for '{query}' in {directory}...")
         
-        results = self.agent.search_files_by_content(directory, query)
-        self.display_search_results(results)
+        matches = self.agent.iter_search_files_by_content(directory, query)
+        self.stream_search_results(matches, self.search_limit)
     
     def _handle_organize(self):
         """Handle organize intent."""
@@ -57,7 +58,7 @@ class CLI:
         print(f"🗂️ Organizing files in {directory}...")
         
         result = self.agent.organize_files_by_content(directory)
-        self._display_organize_results(result)
+        self.display_organize_results(result)
     
     def display_search_results(self, results: List[Dict[str, Any]]):
         """Display search results."""
@@ -69,17 +70,60 @@ class CLI:
         print("-" * 60)
         
         for i, result in enumerate(results, 1):
-            print(f"{i}. 📄 {result['file']}")
-            print(f"   Size: {result['size']} bytes")
-            print(f"   Modified: {result['modified']}")
-            print(f"   Relevance: {result['relevance']}")
-            print()
+            self._print_search_result(i, result)
     
-    def _display_organize_results(self, result: Dict[str, Any]):
+    def stream_search_results(self, matches: Iterable[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Display search matches as they arrive, stopping after limit matches.
+        
+        Ctrl+C stops the search and keeps the matches shown so far.
+        """
+        results = []
+        try:
+            for result in matches:
+                results.append(result)
+                print(f"\n🎯 Match #{len(results)}:")
+                self._print_search_result(len(results), result)
+                if limit and len(results) >= limit:
+                    print(f"⏹️  Reached limit of {limit} matches.")
+                    break
+        except KeyboardInterrupt:
+            print("\n⚠️  Search interrupted. Keeping partial results.")
+        finally:
+            if hasattr(matches, "close"):
+                matches.close()
+        
+        if results:
+            print(f"\n📊 Found {len(results)} relevant files:")
+            print("-" * 60)
+            for result in results:
+                print(f"  📄 {result['file']}")
+        else:
+            print("❌ No relevant files found.")
+        return results
+    
+    def _print_search_result(self, index: int, result: Dict[str, Any]):
+        """Print a single search result."""
+        print(f"{index}. 📄 {result['file']}")
+        print(f"   Size: {result['size']} bytes")
+        print(f"   Modified: {result['modified']}")
+        print(f"   Relevance: {result['relevance']}")
+        if result.get("duplicate_of"):
+            print(f"   Duplicate of: {result['duplicate_of']}")
+        if result.get("snippet"):
+            print(f"   Match at character {result['offset']}: {result['snippet']}")
+        print()
+    
+    def display_organize_results(self, result: Dict[str, Any]):
         """Display organization results."""
         moved_files = result.get("moved", [])
+        planned = result.get("planned", [])
         errors = result.get("errors", [])
         
+        if planned and not moved_files:
+            print(f"\n📝 Planned {len(planned)} moves:")
+            for file_info in planned:
+                print(f"  📄 {file_info['original_path']} → 📁 {file_info['new_path']}")
+        
         if moved_files:
             print(f"\n✅ Successfully moved {len(moved_files)} files:")
             for file_info in moved_files:
@@ -90,9 +134,62 @@ class CLI:
             for error in errors:
                 print(f"  ⚠️ {error}")
         
-        if not moved_files and not errors:
+        if not moved_files and not planned and not errors:
             print("ℹ️ No files were organized.")
     
+    def display_undo_results(self, result: Dict[str, Any]):
+        """Display the outcome of undoing an organize job."""
+        restored = result.get("restored", [])
+        errors = result.get("errors", [])
+        
+        if restored:
+            print(f"\n↩️  Restored {len(restored)} files to their original folders.")
+        
+        if errors:
+            print(f"\n❌ Encountered {len(errors)} errors:")
+            for error in errors:
+                print(f"  ⚠️ {error}")
+        
+        if not restored and not errors:
+            print("ℹ️ No files were restored.")
+    
+    def display_scan_results(self, categorized_files: Dict[str, List[str]]):
+        """Display a per-category summary of a directory scan."""
+        total = sum(len(files) for files in categorized_files.values())
+        if not total:
+            print("ℹ️ No files found.")
+            return
+        
+        print(f"\n📊 Scanned {total} files:")
+        print("-" * 60)
+        for category, files in sorted(categorized_files.items(), key=lambda item: -len(item[1])):
+            print(f"  📁 {category}: {len(files)} files")
+    
+    def display_duplicate_results(self, report: Dict[str, Any]):
+        """Display duplicate groups, largest savings first."""
+        groups = report.get("groups", [])
+        if not groups:
+            print(f"ℹ️ No duplicates among {report.get('files', 0)} files.")
+            return
+        
+        for number, group in enumerate(groups, 1):
+            label = "Identical" if group["kind"] == "exact" else "Near-identical"
+            print(f"\n🧬 Group {number}: {label}, {len(group['files'])} files, "
+                  f"{self._format_bytes(group['reclaimable'])} reclaimable")
+            for path, size in zip(group["files"], group["sizes"]):
+                print(f"  📄 {path} ({self._format_bytes(size)})")
+        
+        print("-" * 60)
+        print(f"📊 {len(groups)} groups, {report['duplicates']} redundant files, "
+              f"{self._format_bytes(report['reclaimable'])} reclaimable by removing identical copies.")
+    
+    @staticmethod
+    def _format_bytes(size: int) -> str:
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024 or unit == "GB":
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+            size /= 1024
+    
     def _show_help(self):
         """Show help information."""
         print("\n🆘 Available Commands:")
@@ -0,0 +1,53 @@
+"""
+Concurrency helpers.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from .metrics import metrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], workers: int = 1,
+                max_pending: Optional[int] = None, executor: Optional[Executor] = None) -> Iterator[R]:
+    """Apply fn to items on a thread pool, yielding results in input order.
+    
+    At most max_pending calls (default 2 * workers) are queued or running at once,
+    so a slow consumer or slow server applies backpressure to the producer instead
+    of piling up work. Closing the generator cancels calls that have not started.
+    A shared `executor` is used instead of a private pool and is left running.
+    """
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    
+    max_pending = max_pending or workers * 2
+    owned = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    
+    def timed(item, submitted):
+        metrics.observe("queue_wait", time.perf_counter() - submitted)
+        return fn(item)
+    
+    try:
+        for item in items:
+            if metrics.enabled:
+                pending.append(executor.submit(timed, item, time.perf_counter()))
+            else:
+                pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        if owned:
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            for future in pending:
+                future.cancel()
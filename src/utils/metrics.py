@@ -0,0 +1,194 @@
+"""
+Lightweight per-stage tracing and metrics.
+
+Instrumented code calls `metrics.span("stage")`, `metrics.observe(...)` and
+`metrics.count(...)` on the shared `metrics` instance. While it is disabled (the
+default) spans are a shared no-op object and the other calls return immediately.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+class _NullSpan:
+    """Span used while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """Times a block of code and records it under a stage name."""
+
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe(self._stage, time.perf_counter() - self._start, self._start)
+        return False
+
+class _Histogram:
+    """Duration histogram with Prometheus-style cumulative buckets and a sample reservoir."""
+
+    __slots__ = ("count", "total", "buckets", "samples")
+
+    def __init__(self, n_buckets: int):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * n_buckets
+        self.samples: List[float] = []
+
+class Metrics:
+    """Collects stage durations, counters and optional trace events."""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    MAX_SAMPLES = 100000
+    MAX_TRACE_EVENTS = 1000000
+
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.reset()
+
+    def enable(self, tracing: bool = False):
+        """Start collecting; with tracing also keep one event per span for the trace file."""
+        self.enabled = True
+        self.tracing = self.tracing or tracing
+
+    def disable(self):
+        self.enabled = False
+        self.tracing = False
+
+    def reset(self):
+        """Drop everything collected so far."""
+        with self._lock:
+            self._histograms: Dict[str, _Histogram] = {}
+            self._counters: Dict[str, float] = {}
+            self._events: List[Dict] = []
+
+    def span(self, stage: str):
+        """Context manager timing a stage."""
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def observe(self, stage: str, seconds: float, start: Optional[float] = None):
+        """Record one duration for a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram(len(self.BUCKETS))
+            histogram.count += 1
+            histogram.total += seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    histogram.buckets[i] += 1
+            if len(histogram.samples) < self.MAX_SAMPLES:
+                histogram.samples.append(seconds)
+            if self.tracing and len(self._events) < self.MAX_TRACE_EVENTS:
+                begin = start if start is not None else time.perf_counter() - seconds
+                self._events.append({
+                    "name": stage,
+                    "ph": "X",
+                    "ts": round((begin - self._origin) * 1e6, 1),
+                    "dur": round(seconds * 1e6, 1),
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                })
+
+    def count(self, name: str, value: float = 1):
+        """Add to a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict:
+        """Return counters and per-stage statistics as plain data."""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                samples = sorted(histogram.samples)
+                stages[stage] = {
+                    "count": histogram.count,
+                    "total_seconds": histogram.total,
+                    "mean_ms": histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+                    "p50_ms": self._percentile(samples, 0.50) * 1000,
+                    "p95_ms": self._percentile(samples, 0.95) * 1000,
+                    "p99_ms": self._percentile(samples, 0.99) * 1000,
+                }
+            return {"stages": stages, "counters": dict(self._counters)}
+
+    @staticmethod
+    def _percentile(ordered: List[float], fraction: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+    def format_summary(self) -> str:
+        """Render the --profile table."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<22} {'count':>8} {'total s':>10} {'mean ms':>10} {'p95 ms':>10} {'p99 ms':>10}",
+                 "-" * 75]
+        for stage, row in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+            lines.append(f"{stage:<22} {row['count']:>8d} {row['total_seconds']:>10.3f} "
+                         f"{row['mean_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['p99_ms']:>10.2f}")
+        if snapshot["counters"]:
+            lines.append("")
+            for name, value in sorted(snapshot["counters"].items()):
+                lines.append(f"{name:<22} {value:>14,.0f}")
+        return "\n".join(lines)
+
+    def write_trace(self, path: str):
+        """Write collected spans in Chrome trace event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self._events)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "counters": self.snapshot()["counters"]}, f)
+
+    def prometheus_text(self, prefix: str = "lfea") -> str:
+        """Render counters and stage histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value:g}")
+
+            metric = f"{prefix}_stage_duration_seconds"
+            if self._histograms:
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                for bound, bucket in zip(self.BUCKETS, histogram.buckets):
+                    lines.append(f'{metric}_bucket{{stage="{label}",le="{bound:g}"}} {bucket}')
+                lines.append(f'{metric}_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{label}"}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{stage="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomically write the Prometheus text file (for a node_exporter textfile collector)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+metrics = Metrics()
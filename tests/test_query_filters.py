@@ -0,0 +1,65 @@
+"""
+Tests for the query filter parser: everyday content words must not become filters.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.config.settings import Config
+from src.core.query_filters import MetadataFilter, QueryFilterParser
+
+NOW = datetime(2024, 6, 15, 12, 0).timestamp()
+EXTENSION_CATEGORIES = {extension: category
+                        for category, extensions in Config()._get_default_categories().items()
+                        for extension in extensions}
+DOCUMENTS = frozenset(['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'])
+
+@pytest.fixture
+def parser():
+    return QueryFilterParser(EXTENSION_CATEGORIES)
+
+@pytest.mark.parametrize("query", [
+    "pictures of mango",
+    "photos of my cat",
+    "images of the coast",
+    "archives of old letters",
+    "movies we liked",
+    "docs about taxes",
+    "spreadsheets about the budget",
+    "last day of school",
+    "the past year in review",
+    "what happened today",
+    "sales in 2019",
+    "over 5 m employees",
+    "under 3 k words",
+])
+def test_content_words_stay_in_the_query(parser, query):
+    found, remaining = parser.parse(query, NOW)
+    assert not found
+    assert remaining == query
+
+def test_explicit_category(parser):
+    found, remaining = parser.parse("image files of mango", NOW)
+    assert found.types == [(frozenset(), frozenset({"images"}))]
+    assert remaining == "mango"
+
+def test_explicit_dates_and_sizes(parser):
+    found, remaining = parser.parse("PDFs modified last week larger than 1 MB about invoices", NOW)
+    assert found.types == [(frozenset({".pdf"}), frozenset())]
+    assert found.min_size == 1024 ** 2
+    assert found.modified_after == NOW - 7 * 86400
+    assert remaining == "invoices"
+
+def test_explicit_year(parser):
+    found, remaining = parser.parse("sales edited in 2019", NOW)
+    assert found.modified_after == datetime(2019, 1, 1).timestamp()
+    assert found.modified_before == datetime(2020, 1, 1).timestamp()
+    assert remaining == "sales"
+
+def test_within_drops_types_without_documents(parser):
+    found, _ = parser.parse("image files or pdf files of mango", NOW)
+    found = found.merge(MetadataFilter(categories=["images"]))
+    kept, dropped = found.within(DOCUMENTS, EXTENSION_CATEGORIES)
+    assert kept.types == [(frozenset({".pdf"}), frozenset({"images"}))]
+    assert dropped == ["type images"]